@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the tutorial10 gearbox pipeline.
+
+Inputs are pinned in tutorial10_inputs.json: efficiency map, WLTP cycle and car of scripts/script10.py, with the
+four speed ranges of scripts/script9_simple_gearbox.py for the simulations (script10 ones do not cover the whole
+cycle) and the three script10 ones for the generator.
+
+Each stage is timed at small, medium and large scale, then run once more under tracemalloc for its peak memory.
+Results are written as JSON, and can be compared to a previous results file:
+
+    python benchmarks/tutorial10_benchmark.py --output new.json --compare old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import tutorials.tutorial10 as objects
+
+INPUTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tutorial10_inputs.json')
+SCALES = ['small', 'medium', 'large']
+
+
+def load_inputs():
+    with open(INPUTS_PATH, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def efficiency_map(inputs, grid_size: int = None):
+    """
+    Pinned efficiency map, or the same map resampled on a grid_size x grid_size grid.
+    """
+    pinned_map = objects.EfficiencyMap(inputs['engine_speeds'], inputs['engine_torques'], inputs['mass_flow_rate'],
+                                       inputs['fuel_hv'])
+    if grid_size is None:
+        return pinned_map
+    return pinned_map.resample(grid_size, grid_size)
+
+
+def cycle(inputs, repeat: float = 1.):
+    """
+    Pinned WLTP cycle, truncated or repeated to repeat times its length.
+    """
+    cycle_speeds = inputs['cycle_speeds']
+    number_samples = int(len(cycle_speeds) * repeat)
+    cycle_speeds = (cycle_speeds * int(np.ceil(repeat)))[:number_samples]
+    return objects.WLTPCycle(cycle_speeds, inputs['car_mass'], inputs['tire_radius'])
+
+
+def gearbox(inputs, speed_ranges_key: str = 'speed_ranges'):
+    engine = objects.Engine(efficiency_map(inputs), inputs['setpoint_speed'], inputs['setpoint_torque'])
+    return objects.GearBox(engine, inputs[speed_ranges_key])
+
+
+def optimizer(inputs, repeat: float = 1.):
+    return objects.GearBoxOptimizer(gearbox(inputs), cycle(inputs, repeat), [0.5, 6])
+
+
+def generator(inputs, max_number_shaft_assemblies: int, max_number_gears: int):
+    return objects.GearBoxGenerator(gearbox(inputs, 'generator_speed_ranges'), number_inputs=2,
+                                    max_number_shaft_assemblies=max_number_shaft_assemblies,
+                                    max_number_gears=max_number_gears)
+
+
+X_REFERENCE = [2., 0.8, 0.7, 0.9]
+
+
+# Setup functions build, out of the measurements, the callable to measure for the given scale parameter
+
+def setup_efficiency_map(inputs, grid_size):
+    return lambda: efficiency_map(inputs, grid_size)
+
+
+def setup_gear_choice(inputs, repeat):
+    gearbox_optimizer = optimizer(inputs, repeat)
+    gearbox_optimizer.gearbox.update(X_REFERENCE)
+    samples = list(zip(gearbox_optimizer.wltp_cycle.wheel_speeds.tolist(),
+                       gearbox_optimizer.wltp_cycle.cycle_torques.tolist()))
+
+    def run():
+        for cycle_speed, cycle_torque in samples:
+            gearbox_optimizer.gearbox.gear_choice(cycle_speed, cycle_torque)
+    return run
+
+
+def setup_objective(inputs, repeat):
+    gearbox_optimizer = optimizer(inputs, repeat)
+    return lambda: gearbox_optimizer.objective(X_REFERENCE)
+
+
+def setup_optimize(inputs, max_loops):
+    gearbox_optimizer = optimizer(inputs)
+    return lambda: gearbox_optimizer.optimize(max_loops=max_loops, seed=0)
+
+
+def setup_generate(inputs, sizes):
+    gearbox_generator = generator(inputs, *sizes)
+    return gearbox_generator.generate
+
+
+def setup_clustering(inputs, sizes):
+    gearboxes = generator(inputs, *sizes).generate()
+
+    def run():
+        np.random.seed(0)
+        return objects.Clustering(gearboxes)
+    return run
+
+
+# Setup function and parameter of each scale, for each stage
+STAGES = {
+    'efficiency_map': (setup_efficiency_map, {'small': None, 'medium': 50, 'large': 200}),
+    'gear_choice': (setup_gear_choice, {'small': 0.1, 'medium': 1, 'large': 5}),
+    'objective': (setup_objective, {'small': 0.1, 'medium': 1, 'large': 10}),
+    'optimize': (setup_optimize, {'small': 5, 'medium': 20, 'large': 100}),
+    'generate': (setup_generate, {'small': (4, 4), 'medium': (5, 5), 'large': (5, 6)}),
+    'clustering': (setup_clustering, {'small': (4, 4), 'medium': (5, 5), 'large': (5, 6)}),
+}
+
+
+def measure(function, repeat: int):
+    """
+    Wall times of repeat calls, then peak memory allocated during one more call.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'times': times, 'min_time': min(times), 'median_time': statistics.median(times),
+            'peak_memory': peak_memory}
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                         cwd=os.path.dirname(INPUTS_PATH)).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+            'numpy': np.__version__, 'platform': platform.platform(), 'processor': platform.processor(),
+            'cpu_count': os.cpu_count()}
+
+
+def run_benchmarks(stages, scales, repeat: int):
+    inputs = load_inputs()
+    results = []
+    for stage in stages:
+        setup, parameters = STAGES[stage]
+        for scale in scales:
+            function = setup(inputs, parameters[scale])
+            result = {'stage': stage, 'scale': scale, 'parameters': parameters[scale]}
+            result.update(measure(function, repeat))
+            results.append(result)
+            print(f"{stage:>15} {scale:>7}: {result['median_time']:10.4f} s {result['peak_memory'] / 2**20:10.2f} MiB",
+                  file=sys.stderr)
+    return results
+
+
+def compare(results, reference_results):
+    """
+    Print the speedup and memory ratio of each benchmark found in both results.
+    """
+    reference = {(result['stage'], result['scale']): result for result in reference_results}
+    for result in results:
+        key = (result['stage'], result['scale'])
+        if key in reference:
+            speedup = reference[key]['median_time'] / result['median_time']
+            memory_ratio = result['peak_memory'] / max(reference[key]['peak_memory'], 1)
+            print(f'{key[0]:>15} {key[1]:>7}: speedup {speedup:8.2f}  memory ratio {memory_ratio:8.2f}',
+                  file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--scales', nargs='+', choices=SCALES, default=SCALES)
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed calls of each benchmark')
+    parser.add_argument('--output', default='tutorial10_benchmark.json', help='JSON results file')
+    parser.add_argument('--compare', help='previous JSON results file to compare to')
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments.stages, arguments.scales, arguments.repeat)
+    with open(arguments.output, 'w', encoding='utf-8') as file:
+        json.dump({'environment': environment(), 'repeat': arguments.repeat, 'results': results}, file, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare, 'r', encoding='utf-8') as file:
+            compare(results, json.load(file)['results'])
+
+
+if __name__ == '__main__':
+    main()
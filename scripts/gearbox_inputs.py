@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Inputs of the gearbox tutorials scripts: efficiency map, car and speed ranges of script10.py and
+script9_simple_gearbox.py, with the first phase of their WLTP cycle.
+
+Objects are built with the classes of the given tutorial module, tutorial9 and tutorial10 ones taking the same inputs.
+"""
+import numpy as np
+
+engine_speeds = [float(speed) * np.pi / 30 for speed in np.linspace(500, 6000, num=12)]  # in rad/s
+engine_torques = [15.6, 31.2, 46.8, 62.4, 78, 93.6, 109.2, 124.8, 140.4, 156, 171.6]  # in N*m
+mass_flow_rate = [[0.1389, 0.2009, 0.2524, 0.3006, 0.3471, 0.4264, 0.4803, 0.5881, 0.5881, 0.6535, 0.7188],
+                  [0.2777, 0.3659, 0.4582, 0.5587, 0.6453, 0.7792, 0.8977, 1.0325, 1.1762, 1.3069, 1.4376],
+                  [0.4166, 0.5538, 0.7057, 0.8332, 0.9557, 1.0733, 1.2127, 1.3428, 1.5438, 1.9604, 2.1564],
+                  [0.5391, 0.7188, 0.9116, 1.0913, 1.2497, 1.4115, 1.5552, 1.7774, 2.0290, 2.3851, 2.8752],
+                  [0.6330, 0.8658, 1.0904, 1.2906, 1.5111, 1.6786, 1.9440, 2.2217, 2.4995, 2.8997, 3.5940],
+                  [0.7106, 0.9949, 1.2718, 1.5193, 1.7888, 2.0878, 2.3671, 2.6661, 2.9993, 3.5286, 4.3128],
+                  [0.7433, 1.0806, 1.3722, 1.7839, 2.2013, 2.5490, 2.8817, 3.1562, 3.5507, 4.1739, 5.0316],
+                  [0.9475, 1.2938, 1.7290, 2.2087, 2.5648, 2.9993, 3.3391, 3.6855, 4.2932, 4.8355, 5.7504],
+                  [1.1027, 1.6026, 2.1525, 2.5877, 2.9957, 3.4184, 3.8852, 4.4108, 5.0151, 5.6238, 6.4692],
+                  [1.5519, 2.0910, 2.5730, 3.0222, 3.4715, 3.8717, 4.4998, 5.0642, 5.7781, 6.4528, 7.1880],
+                  [1.8868, 2.5517, 3.1537, 3.6479, 4.0882, 4.4206, 5.2203, 5.8941, 6.5500, 7.2329, 7.9068],
+                  [2.0584, 2.8817, 3.5286, 4.0775, 4.5578, 5.1165, 5.6948, 6.4300, 7.1455, 7.8414, 8.6256]]  # in g/s
+mass_flow_rate = [[mass_flow / 1000 for mass_flow in row] for row in mass_flow_rate]  # in kg/s
+fuel_hv = 0.012068709 * 3.6e9  # in J/kg
+setpoint_speed = 600 * np.pi / 30  # in rad/s
+setpoint_torque = 100
+
+cycle_speeds = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.2, 3.1, 5.7, 8.0, 10.1, 12.0, 13.8, 15.4,
+                16.7, 17.7, 18.3, 18.8, 18.9, 18.4, 16.9, 14.3, 10.8, 7.1, 4.0, 0.0, 0.0, 0.0, 0.0, 1.5, 3.8, 5.6, 7.5,
+                9.2, 10.8, 12.4, 13.8, 15.2, 16.3, 17.3, 18.0, 18.8, 19.5, 20.2, 20.9, 21.7, 22.4, 23.1, 23.7, 24.4,
+                25.1, 25.4, 25.2, 23.4, 21.8, 19.7, 17.3, 14.7, 12.0, 9.4, 5.6, 3.1, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.7, 1.1, 1.9, 2.5, 3.5, 4.7, 6.1, 7.5, 9.4,
+                11.0, 12.9, 14.5, 16.4, 18.0, 20.0, 21.5, 23.5, 25.0, 26.8, 28.2, 30.0, 31.4, 32.5, 33.2, 33.4, 33.7,
+                33.9, 34.2, 34.4, 34.7, 34.9, 35.2, 35.4, 35.7, 35.9, 36.6, 37.5, 38.4, 39.3, 40.0, 40.6, 41.1, 41.4,
+                41.6, 41.8, 41.8, 41.9, 41.9, 42.0, 42.0, 42.2, 42.3, 42.6, 43.0, 43.3, 43.7, 44.0, 44.3, 44.5, 44.6,
+                44.6, 44.5, 44.4, 44.3, 44.2, 44.1, 44.0, 43.9, 43.8, 43.7, 43.6, 43.5, 43.4, 43.3, 43.1, 42.9, 42.7,
+                42.5, 42.3, 42.2, 42.2, 42.2, 42.3, 42.4, 42.5, 42.7, 42.9, 43.1, 43.2, 43.3, 43.4, 43.4, 43.2, 42.9,
+                42.6, 42.2, 41.9, 41.5, 41.0, 40.5, 39.9, 39.3, 38.7, 38.1, 37.5, 36.9, 36.3, 35.7, 35.1, 34.5, 33.9,
+                33.6, 33.5, 33.6, 33.9, 34.3, 34.7, 35.1, 35.5, 35.9, 36.4, 36.9, 37.4, 37.9, 38.3, 38.7, 39.1, 39.3,
+                39.5, 39.7, 39.9, 40.0, 40.1, 40.2, 40.3, 40.4, 40.5, 40.5, 40.4, 40.3, 40.2, 40.1, 39.7, 38.8, 37.4,
+                35.6, 33.4, 31.2, 29.1, 27.6, 26.6, 26.2, 26.3, 26.7, 27.5, 28.4, 29.4, 30.4, 31.2, 31.9, 32.5, 33.0,
+                33.4, 33.8, 34.1, 34.3, 34.3, 33.9, 33.3, 32.6, 31.8, 30.7, 29.6, 28.6, 27.8, 27.0, 26.4, 25.8, 25.3,
+                24.9, 24.5, 24.2, 24.0, 23.8, 23.6, 23.5, 23.4, 23.3, 23.3, 23.2, 23.1, 23.0, 22.8, 22.5, 22.1, 21.7,
+                21.1, 20.4, 19.5, 18.5, 17.6, 16.6, 15.7, 14.9, 14.3, 14.1, 14.0, 13.9, 13.8, 13.7, 13.6, 13.5, 13.4,
+                13.3, 13.2, 13.2, 13.2, 13.4, 13.5, 13.7, 13.8, 14.0, 14.1, 14.3, 14.4, 14.4, 14.4, 14.3, 14.3, 14.0,
+                13.0, 11.4, 10.2, 8.0, 7.0, 6.0, 5.5, 5.0, 4.5, 4.0, 3.5, 3.0, 2.5, 2.0, 1.5, 1.0, 0.5, 0.0, 0.0, 0.0,
+                0.0, 0.0, 0.0, 2.2, 4.5, 6.6, 8.6, 10.6, 12.5, 14.4, 16.3, 17.9, 19.1, 19.9, 20.3, 20.5, 20.7, 21.0,
+                21.6, 22.6, 23.7, 24.8, 25.7, 26.2, 26.4, 26.4, 26.4, 26.5, 26.6, 26.8, 26.9, 27.2, 27.5, 28.0, 28.8,
+                29.9, 31.0, 31.9, 32.5, 32.6, 32.4, 32.0, 31.3, 30.3, 28.0, 27.0, 24.0, 22.5, 19.0, 17.5, 14.0, 12.5,
+                9.0, 7.5, 4.0, 2.9, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.6, 3.1, 4.6, 6.1, 7.8, 9.5, 11.3, 13.2, 15.0, 16.8, 18.4,
+                20.1, 21.6, 23.1, 24.6, 26.0, 27.5, 29.0, 30.6, 32.1, 33.7, 35.3, 36.8, 38.1, 39.3, 40.4, 41.2, 41.9,
+                42.6, 43.3, 44.0, 44.6, 45.3, 45.5, 45.5, 45.2, 44.7, 44.2, 43.6, 43.1, 42.8, 42.7, 42.8, 43.3, 43.9,
+                44.6, 45.4, 46.3, 47.2, 47.8, 48.2, 48.5, 48.7, 48.9, 49.1, 49.1, 49.0, 48.8, 48.6, 48.5, 48.4, 48.3,
+                48.2, 48.1, 47.5, 46.7, 45.7, 44.6, 42.9, 40.8, 38.2, 35.3, 31.8, 28.7, 25.8, 22.9, 20.2, 17.3, 15.0,
+                12.3, 10.3, 7.8, 6.5, 4.4, 3.2, 1.2, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]  # in km/h
+cycle_speeds = [speed * 1000 / 3600 for speed in cycle_speeds]  # in m/s
+car_mass = 1524  # in kg
+tire_radius = 0.1905  # in m
+
+speed_ranges = [[0, 30], [20, 40], [30, 50], [45, 70]]  # in km/h
+speed_ranges = [[speed * 1000 * 2 / (3600 * tire_radius) for speed in speed_range]
+                for speed_range in speed_ranges]  # in rad/s
+
+
+def efficiency_map(objects):
+    return objects.EfficiencyMap(engine_speeds, engine_torques, mass_flow_rate, fuel_hv)
+
+
+def engine(objects):
+    return objects.Engine(efficiency_map(objects), setpoint_speed, setpoint_torque)
+
+
+def wltp_cycle(objects):
+    return objects.WLTPCycle(cycle_speeds, car_mass, tire_radius)
+
+
+def gearbox(objects, number_speed_ranges: int = 4):
+    return objects.GearBox(engine(objects), speed_ranges[:number_speed_ranges])
+
+
+def gearbox_generator(objects, number_speed_ranges: int = 3, max_number_gears: int = 5):
+    """
+    Generator of tutorial10 gearboxes, with the three speed ranges of script10.py by default.
+    """
+    return objects.GearBoxGenerator(gearbox(objects, number_speed_ranges), number_inputs=2,
+                                    max_number_shaft_assemblies=4, max_number_gears=max_number_gears)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Clustering of generated gearboxes with their features projected in 2D by MDS, by PCA, or by either depending on size.
+"""
+import numpy as np
+
+import gearbox_inputs
+import tutorials.tutorial10 as objects
+
+gearboxes = gearbox_inputs.gearbox_generator(objects).generate(max_number_solutions=30)
+
+clusterings = {projection: objects.Clustering(gearboxes, projection=projection)
+               for projection in ['mds', 'pca']}
+for clustering in clusterings.values():
+    assert np.array(clustering.matrix_mds).shape == (len(gearboxes), 2)
+    # Gearboxes are reordered by cluster, each group of indexes holding the gearboxes of one cluster
+    assert sorted(map(id, clustering.gearboxes_ordered)) == sorted(map(id, gearboxes))
+    assert sum(clustering.list_indexes_groups, []) == list(range(len(gearboxes)))
+    for cluster, indexes in zip(clustering.clusters, clustering.list_indexes_groups):
+        assert {clustering.labels_reordered[index] for index in indexes} == {cluster}
+
+# The projection does not change the clusters
+assert clusterings['mds'].labels == clusterings['pca'].labels
+assert clusterings['mds'].list_indexes_groups == clusterings['pca'].list_indexes_groups
+
+# Automatic projection uses MDS up to max_mds_size gearboxes, PCA above
+assert objects.Clustering(gearboxes, projection='auto', max_mds_size=len(gearboxes) - 1).matrix_mds \
+    == clusterings['pca'].matrix_mds
+small_clustering = objects.Clustering(gearboxes[:10], projection='auto', max_mds_size=10)
+assert np.array(small_clustering.matrix_mds).shape == (10, 2)
+
+try:
+    objects.Clustering(gearboxes, projection='tsne')
+except ValueError:
+    pass
+else:
+    raise AssertionError('Unknown projections should be rejected')
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Drive cycles of a CycleLibrary: memory mapped speeds, shared WLTPCycle objects and their serialization.
+"""
+import copy
+import json
+import tempfile
+
+import numpy as np
+
+import gearbox_inputs
+import tutorials.tutorial10 as objects
+
+cycle_speeds = gearbox_inputs.cycle_speeds
+car_mass = gearbox_inputs.car_mass
+tire_radius = gearbox_inputs.tire_radius
+wltp_cycle = gearbox_inputs.wltp_cycle(objects)
+
+with tempfile.TemporaryDirectory() as library_directory:
+    library = objects.CycleLibrary(library_directory)
+    library.add('wltp', cycle_speeds)
+    library.add('wltp_low', cycle_speeds[:500])
+    assert library.names() == ['wltp', 'wltp_low']
+
+    library_cycle = library.cycle('wltp', car_mass, tire_radius)
+    assert library.cycle('wltp', car_mass, tire_radius) is library_cycle
+    assert library.cycle('wltp', 1.1 * car_mass, tire_radius) is not library_cycle
+    # Speeds are read from the file, not copied in memory
+    assert isinstance(library_cycle.cycle_speeds.base, np.memmap)
+    assert library_cycle == wltp_cycle
+    assert np.array_equal(library_cycle.cycle_torques, wltp_cycle.cycle_torques)
+
+    dict_cycle = json.loads(json.dumps(library_cycle.to_dict()))
+    assert dict_cycle['cycle_speeds'] == cycle_speeds
+    cycle_copy = objects.WLTPCycle.dict_to_object(dict_cycle)
+    assert cycle_copy == library_cycle
+    assert cycle_copy._data_hash() == library_cycle._data_hash()
+
+    cycle_copy = copy.deepcopy(library_cycle)
+    assert not isinstance(cycle_copy.cycle_speeds, np.memmap) and cycle_copy == library_cycle
+    assert library.cycle('wltp_low', car_mass, tire_radius) != library_cycle
+
+    # Adding a cycle again drops the cycles built from its previous speeds, which keep them
+    library.add('wltp', cycle_speeds[::-1])
+    assert library.cycle('wltp', car_mass, tire_radius) != library_cycle
+    assert library_cycle == wltp_cycle
+    del library, library_cycle
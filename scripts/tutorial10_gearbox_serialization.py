@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generated gearboxes serialized with their compact graph form, lazily rebuilt, and compared by topology.
+"""
+import copy
+import json
+
+import networkx as nx
+
+import gearbox_inputs
+import tutorials.tutorial10 as objects
+
+gearboxes = gearbox_inputs.gearbox_generator(objects).generate(max_number_solutions=10)
+
+for gearbox in gearboxes:
+    dict_gearbox = json.loads(json.dumps(gearbox.to_dict()))
+    gearbox_copy = objects.GearBox.dict_to_object(dict_gearbox)
+    # Comparing and hashing do not need the graph to be rebuilt
+    assert gearbox_copy == gearbox
+    assert gearbox_copy._data_hash() == gearbox._data_hash()
+    assert gearbox_copy._graph_data is not None
+    assert nx.utils.graphs_equal(gearbox_copy.graph, gearbox.graph)
+    assert gearbox_copy._graph_data is None
+    assert gearbox_copy == gearbox
+
+    # Gearboxes serialized with the networkx node link graph form are still read, whatever the networkx version
+    node_link_data = nx.readwrite.json_graph.node_link_data(gearbox.graph)
+    edges = node_link_data.pop('links' if 'links' in node_link_data else 'edges')
+    for edges_key in ['links', 'edges']:
+        dict_gearbox['graph'] = {**node_link_data, edges_key: edges}
+        assert objects.GearBox.dict_to_object(dict_gearbox) == gearbox
+
+    gearbox_copy = copy.deepcopy(gearbox)
+    assert gearbox_copy.graph is not gearbox.graph and gearbox_copy == gearbox
+
+# Gearboxes of different topologies differ, whatever their other attributes
+assert all(gearbox != gearboxes[0] for gearbox in gearboxes[1:])
+assert len({gearbox.topology_key() for gearbox in gearboxes}) == len(gearboxes)
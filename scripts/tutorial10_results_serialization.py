@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GearBoxResults of an optimized generated gearbox: cycle arrays serialized as binary blocks, copies and data equality.
+"""
+import copy
+import json
+
+import gearbox_inputs
+import tutorials.tutorial10 as objects
+
+generator = gearbox_inputs.gearbox_generator(objects, number_speed_ranges=4, max_number_gears=7)
+generated_gearbox = generator.generate(max_number_solutions=1)[0]
+
+optimizer = objects.GearBoxOptimizer(generated_gearbox, gearbox_inputs.wltp_cycle(objects), [0.5, 6])
+list_gearbox_results = optimizer.optimize(max_loops=2, seed=0)
+gearbox_results = list_gearbox_results[0]
+
+# Result gearboxes are copies of the optimized one, keeping its graph and sharing its engine
+assert gearbox_results.gearbox is not generated_gearbox
+assert gearbox_results.gearbox.engine is generated_gearbox.engine
+assert gearbox_results.gearbox.topology_key() == generated_gearbox.topology_key()
+assert gearbox_results.gearbox.number_shafts == generated_gearbox.number_shafts
+
+dict_results = json.loads(json.dumps(gearbox_results.to_dict()))
+for attribute in objects.GearBoxResults._array_attributes:
+    assert isinstance(dict_results[attribute], dict)
+results_copy = objects.GearBoxResults.dict_to_object(dict_results)
+assert results_copy.gears.dtype == gearbox_results.gears.dtype
+assert results_copy == gearbox_results
+assert results_copy._data_hash() == gearbox_results._data_hash()
+assert results_copy.gearbox.topology_key() == generated_gearbox.topology_key()
+
+# Results written as plain lists by older versions are still read
+for attribute in objects.GearBoxResults._array_attributes:
+    dict_results[attribute] = getattr(gearbox_results, attribute).tolist()
+assert objects.GearBoxResults.dict_to_object(dict_results) == gearbox_results
+
+# Cycle arrays are compared although they are not serialized as attributes
+results_copy = copy.deepcopy(gearbox_results)
+assert results_copy == gearbox_results
+results_copy.fuel_consumptions[len(results_copy.fuel_consumptions) // 2] *= 2
+assert results_copy != gearbox_results
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gearbox generation through an on-disk TopologyCache: generated then read back topologies, and cache eviction.
+"""
+import os
+import tempfile
+
+import gearbox_inputs
+import tutorials.tutorial10 as objects
+
+generator = gearbox_inputs.gearbox_generator(objects)
+gearboxes = generator.generate()
+
+with tempfile.TemporaryDirectory() as cache_directory:
+    generated_gearboxes = generator.generate(cache_directory=cache_directory)
+    cache_files = os.listdir(cache_directory)
+    assert len(cache_files) == 1 and cache_files[0].endswith(objects.TopologyCache.extension)
+
+    cached_gearboxes = generator.generate(cache_directory=cache_directory)
+    for generated_gearboxes_ in [generated_gearboxes, cached_gearboxes]:
+        assert [g.topology_key() for g in generated_gearboxes_] == [g.topology_key() for g in gearboxes]
+        assert [g.graph.graph for g in generated_gearboxes_] == [g.graph.graph for g in gearboxes]
+
+    # The number of inputs is not a generation parameter of the graphs: the entry is shared
+    other_generator = objects.GearBoxGenerator(generator.gearbox, number_inputs=1, max_number_shaft_assemblies=4,
+                                               max_number_gears=5)
+    assert len(other_generator.generate(max_number_solutions=3, cache_directory=cache_directory)) == 3
+    assert os.listdir(cache_directory) == cache_files
+
+    # Corrupted and truncated entries are dropped and generated again
+    cache_path = os.path.join(cache_directory, cache_files[0])
+    with open(cache_path, 'rb') as file:
+        entry = file.read()
+    for corrupted_entry in [b'corrupted', entry[:len(entry) // 2]]:
+        with open(cache_path, 'wb') as file:
+            file.write(corrupted_entry)
+        assert len(generator.generate(cache_directory=cache_directory)) == len(gearboxes)
+
+    # Least recently used entries are evicted once the cache is full
+    cache = objects.TopologyCache(cache_directory, max_size=0)
+    graphs = [g.graph for g in gearboxes[:2]]
+    cache.save(cache.key(parameters='first'), graphs)
+    assert len(cache.load(cache.key(parameters='first'))) == 2
+    cache.save(cache.key(parameters='second'), graphs)
+    assert cache.load(cache.key(parameters='first')) is None
+    assert os.listdir(cache_directory) == [cache.key(parameters='second') + cache.extension]
@@ -5,6 +5,8 @@ Created on Tue May 18 13:11:55 2021
 
 @author: dasilva
 """
+import tempfile
+
 import plot_data
 
 import tutorials.tutorial10 as objects
@@ -84,9 +86,13 @@ number_inputs = 2
 number_shaft_assemblies = 5
 max_number_gears = 5
 
+# Generated topologies are stored in a cache of this run only, so that the generator is always exercised
+topologies_cache = tempfile.TemporaryDirectory()
+
 input_values = {workflow.input_index(block_generator.inputs[1]): 2,
                 workflow.input_index(block_generator.inputs[2]): 5,
                 workflow.input_index(block_generator.inputs[3]): 5,
+                workflow.input_index(block_generate.inputs[3]): topologies_cache.name,
                 workflow.input_index(block_gearbox.inputs[1]): speed_ranges,
                 workflow.input_index(block_engine.inputs[1]): setpoint_speed,
                 workflow.input_index(block_engine.inputs[2]): setpoint_torque,
@@ -97,6 +103,7 @@ input_values = {workflow.input_index(block_generator.inputs[1]): 2,
                 }
 
 workflow_run = workflow.run(input_values)
+topologies_cache.cleanup()
 # solution = workflow_run.output_value[0]
 # plot_data.plot_canvas(solution.plot_data()[0], canvas_id='canvas')
 
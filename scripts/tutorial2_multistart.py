@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Seeded multistart optimization of a reductor layout: distinct solutions, progress reports and parallel restarts.
+"""
+import tutorials.tutorial2_powertransmission as objects
+
+motor = objects.Motor(diameter=0.1, length=0.2, speed=120)
+shafts = [objects.Shaft(pos_x=0, pos_y=0, length=0.1) for _ in range(3)]
+meshes = [objects.Mesh(objects.Gear(diameter=0.1, length=0.01, shaft=shafts[0]),
+                       objects.Gear(diameter=0.1, length=0.01, shaft=shafts[1])),
+          objects.Mesh(objects.Gear(diameter=0.1, length=0.01, shaft=shafts[1]),
+                       objects.Gear(diameter=0.1, length=0.01, shaft=shafts[2]))]
+reductor = objects.Reductor(motor, shafts, meshes)
+optimizer = objects.Optimizer(reductor=reductor, speed_output=500, x_min_max=(-1, 1), y_min_max=(-1, 1))
+
+
+def layout(reductor_):
+    return [(shaft.pos_x, shaft.pos_y) for shaft in reductor_.shafts] \
+        + [(mesh.gear1.diameter, mesh.gear2.diameter) for mesh in reductor_.meshes]
+
+
+progress = []
+list_reductor = optimizer.optimize(max_loops=12, seed=1,
+                                   progress_callback=lambda *report: progress.append(report))
+assert [count for count, _, _ in progress] == list(range(1, 13))
+assert all(max_loops == 12 for _, max_loops, _ in progress)
+assert progress[-1][2] == len(list_reductor) > 0
+assert [reductor_.number_solution for reductor_ in list_reductor] == list(range(len(list_reductor)))
+# Solutions are copies, distinct from each other
+assert all(reductor_ is not reductor for reductor_ in list_reductor)
+assert all(max(abs(a - b) for values, other_values in zip(layout(reductor_), layout(other_reductor))
+               for a, b in zip(values, other_values)) > 1e-3
+           for i, reductor_ in enumerate(list_reductor) for other_reductor in list_reductor[:i])
+
+# A seed gives the same solutions whatever the number of workers
+assert [layout(r) for r in optimizer.optimize(max_loops=12, seed=1)] == [layout(r) for r in list_reductor]
+assert [layout(r) for r in optimizer.optimize(max_loops=12, seed=1, n_workers=2)] \
+    == [layout(r) for r in list_reductor]
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Objective of a whole population of reductor layouts computed at once, compared to the one of each layout.
+"""
+import numpy as npy
+
+import tutorials.tutorial2_powertransmission as objects
+
+motor = objects.Motor(diameter=0.1, length=0.2, speed=120)
+shafts = [objects.Shaft(pos_x=0, pos_y=0, length=0.1) for _ in range(3)]
+meshes = [objects.Mesh(objects.Gear(diameter=0.1, length=0.01, shaft=shafts[0]),
+                       objects.Gear(diameter=0.1, length=0.01, shaft=shafts[1])),
+          objects.Mesh(objects.Gear(diameter=0.1, length=0.01, shaft=shafts[1]),
+                       objects.Gear(diameter=0.1, length=0.01, shaft=shafts[2]))]
+reductor = objects.Reductor(motor, shafts, meshes)
+optimizer = objects.Optimizer(reductor=reductor, speed_output=500, x_min_max=(-1, 1), y_min_max=(-1, 1))
+
+npy.random.seed(0)
+population = [optimizer.cond_init() for _ in range(50)]
+population_objectives = optimizer.population_objective(population)
+assert population_objectives.shape == (len(population),)
+
+# The reductor is not updated by population_objective
+reductor.update(population[0])
+positions = [(shaft.pos_x, shaft.pos_y) for shaft in reductor.shafts]
+optimizer.population_objective(population[1:])
+assert [(shaft.pos_x, shaft.pos_y) for shaft in reductor.shafts] == positions
+
+objectives = [optimizer.objective(x) for x in population]
+assert npy.allclose(population_objectives, objectives, rtol=1e-9, atol=0)
+# A single layout is a population of one
+assert npy.allclose(optimizer.population_objective(population[0]), objectives[0], rtol=1e-9, atol=0)
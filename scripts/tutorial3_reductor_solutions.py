@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reductors of a generator stored as ReductorSolutions: instantiation on demand, serialization and data equality.
+"""
+import copy
+import json
+
+import tutorials.tutorial3_powertransmission_generator as objects
+
+motor = objects.Motor(diameter=0.1, length=0.2, speed=100)
+generator = objects.Generator(motor=motor, speed_output=500, z_min_max=(4, 30))
+list_reductor = generator.generate()
+solutions = generator.solutions()
+assert len(solutions) == len(list_reductor) > 0
+
+
+def teeth(reductor):
+    return [z for mesh in reductor.meshes for z in (mesh.gear1.z, mesh.gear2.z)]
+
+
+# Solutions are the generated reductors, numbered by their index
+for index, (reductor, solution) in enumerate(zip(list_reductor, solutions)):
+    assert teeth(solution) == teeth(reductor) == solutions.teeth[index].tolist()
+    assert solution.number_solution == index
+    assert solution.speed_output() == solutions.speeds[index]
+assert solutions[-1].number_solution == len(solutions) - 1
+try:
+    solutions[len(solutions)]
+except IndexError:
+    pass
+else:
+    raise AssertionError('Indexes out of the solutions should be rejected')
+
+dict_solutions = json.loads(json.dumps(solutions.to_dict()))
+assert dict_solutions['teeth'] == solutions.teeth.tolist()
+solutions_copy = objects.ReductorSolutions.dict_to_object(dict_solutions)
+assert solutions_copy == solutions
+assert solutions_copy._data_hash() == solutions._data_hash()
+assert teeth(solutions_copy[0]) == teeth(solutions[0])
+
+solutions_copy = copy.deepcopy(solutions)
+assert solutions_copy.teeth is not solutions.teeth and solutions_copy == solutions
+solutions_copy.teeth[0, 0] += 1
+assert solutions_copy != solutions
+
+# Solutions of other generators differ
+other_generator = objects.Generator(motor=motor, speed_output=400, z_min_max=(4, 30))
+assert other_generator.solutions() != solutions
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multistart optimization of the 3 ratios gearbox: duplicate solutions, early stopping and parallel restarts.
+"""
+import numpy as np
+
+import gearbox_inputs
+import tutorials.tutorial9_simple_3ratios_gearbox as objects
+
+optimizer = objects.GearBoxOptimizer(gearbox_inputs.gearbox(objects), gearbox_inputs.wltp_cycle(objects), [0.5, 6])
+
+list_gearbox_results, objectives, solutions = optimizer.optimize(max_loops=6, seed=0)
+assert len(list_gearbox_results) == len(objectives) == len(solutions) > 0
+for gearbox_results, objective, x in zip(list_gearbox_results, objectives, solutions):
+    assert objective == optimizer.objective(list(x))
+    assert gearbox_results.gearbox.ratios == optimizer.gearbox.ratios
+
+# Solutions whose ratios are within the tolerance of each other are merged, keeping the best one
+merged_objectives = optimizer.optimize(max_loops=6, seed=0, ratio_tolerance=0.5)[1]
+assert len(merged_objectives) < len(objectives)
+assert min(merged_objectives) == min(objectives)
+
+# Early stopping happens after the same restart, whatever the number of workers
+results = optimizer.optimize(max_loops=8, seed=0, ratio_tolerance=0.5, patience=2)
+parallel_results = optimizer.optimize(max_loops=8, seed=0, ratio_tolerance=0.5, patience=2, n_workers=2)
+assert results[1] == parallel_results[1]
+assert all(np.array_equal(x, other_x) for x, other_x in zip(results[2], parallel_results[2]))
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Surrogate optimization of the 3 ratios gearbox: candidates of the model checked by simulation.
+"""
+import gearbox_inputs
+import tutorials.tutorial9_simple_3ratios_gearbox as objects
+
+optimizer = objects.GearBoxOptimizer(gearbox_inputs.gearbox(objects), gearbox_inputs.wltp_cycle(objects), [0.5, 6])
+
+list_gearbox_results, objectives, solutions = optimizer.optimize_surrogate(number_samples=8, number_iterations=2,
+                                                                           seed=1)
+assert 0 < len(list_gearbox_results) <= 2 * 4
+assert len(objectives) == len(solutions) == len(list_gearbox_results)
+# Returned objectives are the simulated ones, not the model ones, and candidates stay within the bounds
+for gearbox_results, objective, x in zip(list_gearbox_results, objectives, solutions):
+    assert objective == optimizer.objective(list(x))
+    assert objective < optimizer.gearbox.engine.efficiency_map.max_bsfc
+    assert gearbox_results.gearbox.ratios == optimizer.gearbox.ratios
+    assert all(lower <= value <= upper for value, (lower, upper) in zip(x, optimizer.bounds))
+
+parallel_objectives = optimizer.optimize_surrogate(number_samples=8, number_iterations=2, seed=1, n_workers=2)[1]
+assert parallel_objectives == objectives
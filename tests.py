@@ -1,9 +1,12 @@
 import os
+import sys
 
 list_script = [f'scripts/{script_name}' for script_name in os.listdir('scripts') if script_name.endswith('.py')]
 
 print('Executing scripts for CI:')
 top_level_dir = os.getcwd()
+# Scripts import the helper modules next to them, as when they are run from their folder
+sys.path.insert(0, os.path.join(top_level_dir, 'scripts'))
 
 for script_name in list_script:
     if not os.path.isfile(os.path.join(top_level_dir, script_name)):
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Interpolation of engine maps shared by the tutorials.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+class GridInterpolator:
+    """
+    Bilinear interpolation on a regular grid, drop-in replacement for the deprecated scipy interp2d.
+
+    z values are given as z[i_y][i_x]. Points outside of the grid are clamped on its boundary, as interp2d did.
+    Unlike interp2d, x and y arrays are evaluated pointwise and not as a grid.
+    """
+    def __init__(self, x: List[float], y: List[float], z: List[List[float]]):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        z = np.asarray(z, dtype=float)
+        x_order = np.argsort(x)
+        y_order = np.argsort(y)
+        self.x = x[x_order]
+        self.y = y[y_order]
+        self.z = z[np.ix_(y_order, x_order)]
+
+    def __call__(self, x, y):
+        x = np.clip(np.asarray(x, dtype=float), self.x[0], self.x[-1])
+        y = np.clip(np.asarray(y, dtype=float), self.y[0], self.y[-1])
+        i = np.clip(np.searchsorted(self.x, x, side='right') - 1, 0, len(self.x) - 2)
+        j = np.clip(np.searchsorted(self.y, y, side='right') - 1, 0, len(self.y) - 2)
+        tx = (x - self.x[i]) / (self.x[i + 1] - self.x[i])
+        ty = (y - self.y[j]) / (self.y[j + 1] - self.y[j])
+        return (1 - ty) * ((1 - tx) * self.z[j, i] + tx * self.z[j, i + 1]) \
+            + ty * ((1 - tx) * self.z[j + 1, i] + tx * self.z[j + 1, i + 1])
+
+
+def resample_map(engine_speeds: List[float], engine_torques: List[float], mass_flow_rate: List[List[float]],
+                 number_speeds: int, number_torques: int):
+    """
+    Engine map on a regular grid of the same speed and torque ranges, mass flow rates being interpolated bilinearly.
+
+    Gives a coarser map, cheaper to interpolate, from a high-resolution test-bench map, or a finer one.
+
+    :param mass_flow_rate: mass flow rates indexed by [speed, torque]
+    :return: the speeds, torques and mass flow rates of the resampled map, as lists
+    """
+    resampled_speeds = np.linspace(min(engine_speeds), max(engine_speeds), number_speeds)
+    resampled_torques = np.linspace(min(engine_torques), max(engine_torques), number_torques)
+    interpolator = GridInterpolator(engine_torques, engine_speeds, mass_flow_rate)
+    resampled_mass_flow_rate = interpolator(resampled_torques[None, :], resampled_speeds[:, None])
+    return resampled_speeds.tolist(), resampled_torques.tolist(), resampled_mass_flow_rate.tolist()
@@ -6,7 +6,15 @@ Created on Tue Mar  2 13:30:58 2021
 @author: wirajan
 """
 
+import base64
 import copy
+import gzip
+import hashlib
+import json
+import os
+import time
+import zlib
+from collections import OrderedDict, deque
 from itertools import product
 from statistics import mean
 from typing import Any, Dict, List, Tuple
@@ -19,21 +27,30 @@ import numpy as np
 import pandas as pd
 import plot_data
 import plot_data.graph
+from dessia_common import FLOAT_TOLERANCE
 from dessia_common.core import DessiaObject, DisplayObject
 from dessia_common.decorators import plot_data_view
+from dessia_common.serialization import deserialize, update_pointers_data
+from dessia_common.utils.diff import choose_hash, dict_data_eq
 from plot_data.colors import *
-from scipy.interpolate import interp2d
 from scipy.optimize import minimize
 from sklearn.cluster import DBSCAN
+from sklearn.decomposition import PCA
 from sklearn.manifold import MDS
 from sklearn.preprocessing import MinMaxScaler
 
+from tutorials.interpolation import GridInterpolator, resample_map
+from tutorials.worker_pool import (call_worker_method, object_pool, ordered_map, random_point, restart_seeds,
+                                   shutdown)
+
 
 class EfficiencyMap(DessiaObject):
     """
     Build the engine map and then determine its efficiency
     """
     _standalone_in_db = True
+    _non_serializable_attributes = ['bsfc', 'efficiencies', 'min_bsfc', 'max_bsfc', 'max_efficiency', 'max_torque']
+
     def __init__(self, engine_speeds: List[float], engine_torques: List[float],
                  mass_flow_rate: List[List[float]], fuel_hv: float, name: str = ''):
         self.engine_speeds = engine_speeds  # in rad/s
@@ -42,52 +59,131 @@ class EfficiencyMap(DessiaObject):
         self.fuel_hv = fuel_hv  # fuel lower heating value in J/kg
 
         DessiaObject.__init__(self, name=name)
-
-        BSFC = []
-        for i, engine_speed in enumerate(self.engine_speeds):
-            list_bsfc = []
-            for j, engine_torque in enumerate(self.engine_torques):
-                bsfc = self.mass_flow_rate[i][j]/(engine_speed*engine_torque)  # in kg/J
-                list_bsfc.append(bsfc)
-            BSFC.append(list_bsfc)
-        self.bsfc = BSFC
-
-        efficiencies=[]
-        for list_bsfc in BSFC:
-            list_efficiencies=[]
-            for bsfc in list_bsfc:
-                efficiency = 1/(bsfc*self.fuel_hv)
-                list_efficiencies.append(efficiency)
-            efficiencies.append(list_efficiencies)
-        self.efficiencies = efficiencies
+        self.update_map()
+
+    def update_map(self):
+        """
+        Compute BSFC and efficiency grids, as arrays indexed by [speed, torque], and their summary statistics. \
+        Call it again after modifying or replacing the map inputs.
+        """
+        engine_speeds = np.asarray(self.engine_speeds, dtype=float)
+        engine_torques = np.asarray(self.engine_torques, dtype=float)
+        # in kg/J
+        self.bsfc = np.asarray(self.mass_flow_rate, dtype=float)/(engine_speeds[:, None]*engine_torques[None, :])
+        self.efficiencies = 1/(self.bsfc*self.fuel_hv)
+
+        self.min_bsfc = float(self.bsfc.min())
+        self.max_bsfc = float(self.bsfc.max())
+        self.max_efficiency = float(self.efficiencies.max())
+        self.max_torque = float(engine_torques.max())
+        self._interpolators = {}
+
+    def resample(self, number_speeds: int, number_torques: int, name: str = ''):
+        """
+        Same map on a regular number_speeds x number_torques grid, see interpolation.resample_map.
+        """
+        engine_speeds, engine_torques, mass_flow_rate = resample_map(self.engine_speeds, self.engine_torques,
+                                                                     self.mass_flow_rate, number_speeds, number_torques)
+        return EfficiencyMap(engine_speeds, engine_torques, mass_flow_rate, self.fuel_hv, name=name)
+
+    def _interpolator(self, attribute: str):
+        """
+        Interpolator of the given grid, built on first use. update_map drops the interpolators of previous grids.
+        """
+        if attribute not in self._interpolators:
+            self._interpolators[attribute] = GridInterpolator(self.engine_torques, self.engine_speeds,
+                                                              getattr(self, attribute))
+        return self._interpolators[attribute]
+
+    def bsfc_interpolator(self):
+        return self._interpolator('bsfc')
+
+    def efficiency_interpolator(self):
+        return self._interpolator('efficiencies')
 
 
 class WLTPCycle(DessiaObject):
     _standalone_in_db = False
+    _non_serializable_attributes = ['cycle_speeds', 'cycle_torques', 'wheel_speeds', 'accelerations', 'wheel_torques']
     """
     WLTP cycle paremeters and wheel torque calculations
     """
     def __init__(self, cycle_speeds: List[float], car_mass: float,
                  tire_radius: float, dt: float = 1, name: str = ''):
-        self.cycle_speeds = cycle_speeds
+        # Kept as an array, which is a view of the file for cycles memory mapped by a CycleLibrary
+        self.cycle_speeds = np.asarray(cycle_speeds, dtype=float)
         self.car_mass = car_mass
         self.tire_radius = tire_radius
         self.dt = dt
         DessiaObject.__init__(self,name=name)
-        
-        accelerations = []
-        for i in range(len(self.cycle_speeds[:-1])):
-            acceleration = (self.cycle_speeds[i + 1] - self.cycle_speeds[i]) / dt   # acceleration in m/s^2
-            if acceleration < 0:
-                acceleration *= -1
-            accelerations.append(acceleration)
-    
-        cycle_torques=[]
-        for acceleration in accelerations:
-            torque = acceleration*car_mass*tire_radius/2  #torque in Nm
-            cycle_torques.append(torque)
-            
-        self.cycle_torques = cycle_torques 
+
+        # Arrays of the simulated samples, i.e. all samples but the last one
+        self.accelerations = np.abs(np.diff(self.cycle_speeds))/dt  # acceleration in m/s^2
+        self.wheel_torques = self.accelerations*car_mass*tire_radius/2  # torque in Nm
+        self.wheel_speeds = self.cycle_speeds[:-1]*2/tire_radius
+        self.cycle_torques = self.wheel_torques
+
+    def to_dict(self, use_pointers: bool = True, memo=None, path: str = "#", id_method=True, id_memo=None):
+        """
+        Serialize the cycle, its arrays being written as lists.
+        """
+        d = super().to_dict(use_pointers=use_pointers, memo=memo, path=path, id_method=id_method, id_memo=id_memo)
+        d['cycle_speeds'] = self.cycle_speeds.tolist()
+        d['cycle_torques'] = self.cycle_torques.tolist()
+        return d
+
+    def _data_hash(self):
+        # Cycle torques are computed from the cycle speeds and the car parameters, only the speeds are hashed apart
+        return int((DessiaObject._data_hash(self) + choose_hash(self.cycle_speeds.tolist())) % 1e5)
+
+    def _data_eq(self, other_object):
+        if self.cycle_speeds.shape != other_object.cycle_speeds.shape or\
+                not np.allclose(self.cycle_speeds, other_object.cycle_speeds, rtol=0., atol=FLOAT_TOLERANCE):
+            return False
+        return dict_data_eq(self._data_eq_dict(), other_object._data_eq_dict())
+
+    def __deepcopy__(self, memo=None):
+        return self.__class__(np.array(self.cycle_speeds), self.car_mass, self.tire_radius, self.dt, name=self.name)
+
+
+class CycleLibrary:
+    """
+    Directory of drive cycles, each one stored as a .npy array of speeds in m/s and read through memory mapping.
+
+    Cycles are built once per set of car parameters and then shared by the studies using them.
+    """
+    extension = '.npy'
+
+    def __init__(self, directory: str, mmap: bool = True):
+        self.directory = directory
+        self.mmap = mmap
+        self._cycles = {}
+
+    def names(self):
+        return sorted(file_name[:-len(self.extension)] for file_name in os.listdir(self.directory)
+                      if file_name.endswith(self.extension))
+
+    def path(self, name: str):
+        return os.path.join(self.directory, name + self.extension)
+
+    def add(self, name: str, cycle_speeds: List[float]):
+        os.makedirs(self.directory, exist_ok=True)
+        # Written aside then moved, so that the cycles memory mapped from a previous file keep their speeds
+        path = self.path(name)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            np.save(file, np.asarray(cycle_speeds, dtype=float))
+        os.replace(temporary_path, path)
+        self._cycles = {key: cycle for key, cycle in self._cycles.items() if key[0] != name}
+
+    def speeds(self, name: str):
+        return np.load(self.path(name), mmap_mode='r' if self.mmap else None)
+
+    def cycle(self, name: str, car_mass: float, tire_radius: float, dt: float = 1):
+        key = (name, car_mass, tire_radius, dt)
+        if key not in self._cycles:
+            self._cycles[key] = WLTPCycle(self.speeds(name), car_mass, tire_radius, dt, name=name)
+        return self._cycles[key]
 
 
 class Engine(DessiaObject):
@@ -101,19 +197,29 @@ class Engine(DessiaObject):
 
         DessiaObject.__init__(self,name=name)
     
-    def efficiency(self, speed:float, torque:float):
-        interpolate = interp2d(self.efficiency_map.engine_torques,
-                               self.efficiency_map.engine_speeds,
-                               self.efficiency_map.efficiencies)
-        interpolate_efficiency = interpolate(torque, speed)
-        return interpolate_efficiency[0]
-    
-    def consumption_efficiency(self, speed:float, torque: float):
-        interpolate = interp2d(self.efficiency_map.engine_torques,
-                               self.efficiency_map.engine_speeds,
-                               self.efficiency_map.bsfc)
-        interpolate_consumption_efficiency = interpolate(torque, speed)
-        return float(interpolate_consumption_efficiency[0])
+    def efficiency(self, speed, torque):
+        """
+        Engine efficiency for one operating point, or for arrays of speeds and torques.
+        """
+        interpolate_efficiency = self.efficiency_map.efficiency_interpolator()(torque, speed)
+        if interpolate_efficiency.ndim == 0:
+            return float(interpolate_efficiency)
+        return interpolate_efficiency
+
+    def consumption_efficiency(self, speed, torque):
+        """
+        Brake specific fuel consumption for one operating point, or for arrays of speeds and torques.
+        """
+        interpolate_consumption_efficiency = self.efficiency_map.bsfc_interpolator()(torque, speed)
+        if interpolate_consumption_efficiency.ndim == 0:
+            return float(interpolate_consumption_efficiency)
+        return interpolate_consumption_efficiency
+
+
+# One letter codes of the gearbox graph node types, split shaft-gear nodes having no type
+NODE_TYPE_CODES = {'Input Shaft': 'I', 'Output Shaft': 'O', 'Shaft': 'S', 'Gear': 'G', None: '-'}
+# Clutch edge attributes of the gearbox graphs, coded by their position + 1 (0 standing for a plain edge)
+EDGE_CLUTCH_ATTRIBUTES = ['Clutch', 'Clucth']
 
 
 class GearBox(DessiaObject):
@@ -127,6 +233,7 @@ class GearBox(DessiaObject):
         self.speed_ranges = speed_ranges
         self.ratios = ratios
 
+        self._graph_data = None
         self.graph = nx.Graph()
         self.average_path_length = None
         self.average_clutch_distance = None
@@ -138,6 +245,91 @@ class GearBox(DessiaObject):
         self.ave_l_ns = None
         DessiaObject.__init__(self, name=name)
 
+    @property
+    def graph(self):
+        """
+        Gearbox graph, rebuilt from its serialized form on first access after a dict_to_object.
+        """
+        if self._graph_data is not None:
+            self._graph = self.graph_from_dict(self._graph_data)
+            self._graph_data = None
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph):
+        self._graph = graph
+        self._graph_data = None
+
+    @staticmethod
+    def graph_to_dict(graph: nx.Graph):
+        """
+        Compact form of a gearbox graph: node names with one letter type codes, and edges as node indices with \
+        a clutch code. Display attributes set by plot_data are not kept.
+        """
+        node_indices = {node: i for i, node in enumerate(graph.nodes())}
+        node_types = ''.join(NODE_TYPE_CODES[attributes.get('Node Type')] for attributes in graph.nodes.values())
+        clutch_nodes = [node_indices[node] for node, attributes in graph.nodes.items() if attributes.get('Clutch')]
+        edges = []
+        for node1, node2, attributes in graph.edges(data=True):
+            edge_code = 0
+            for code, attribute in enumerate(EDGE_CLUTCH_ATTRIBUTES, start=1):
+                if attribute in attributes:
+                    edge_code = code
+            edges.append([node_indices[node1], node_indices[node2], edge_code])
+        return {'nodes': list(node_indices), 'node_types': node_types, 'clutch_nodes': clutch_nodes,
+                'edges': edges, 'attributes': graph.graph}
+
+    @staticmethod
+    def graph_from_dict(dict_):
+        """
+        Rebuild a graph from graph_to_dict form, or from networkx node link data.
+        """
+        if 'node_types' not in dict_:
+            # Edges of node link data are named links before networkx 3.4 and edges from then on
+            edges = dict_['links'] if 'links' in dict_ else dict_['edges']
+            return nx.readwrite.json_graph.node_link_graph({**dict_, 'links': edges, 'edges': edges})
+        node_types = {code: node_type for node_type, code in NODE_TYPE_CODES.items()}
+        graph = nx.Graph(**dict_['attributes'])
+        for node, code in zip(dict_['nodes'], dict_['node_types']):
+            if node_types[code] is None:
+                graph.add_node(node)
+            else:
+                graph.add_node(node, **{'Node Type': node_types[code]})
+        for index in dict_['clutch_nodes']:
+            graph.nodes[dict_['nodes'][index]]['Clutch'] = True
+        for index1, index2, edge_code in dict_['edges']:
+            if edge_code:
+                graph.add_edge(dict_['nodes'][index1], dict_['nodes'][index2],
+                               **{EDGE_CLUTCH_ATTRIBUTES[edge_code - 1]: True})
+            else:
+                graph.add_edge(dict_['nodes'][index1], dict_['nodes'][index2])
+        return graph
+
+    def topology_key(self):
+        """
+        Hashable form of the gearbox graph, read from its serialized form if the graph was not rebuilt yet.
+        """
+        if self._graph_data is not None and 'node_types' in self._graph_data:
+            graph_dict = self._graph_data
+        else:
+            graph_dict = self.graph_to_dict(self.graph)
+        return (tuple(graph_dict['nodes']), graph_dict['node_types'], tuple(graph_dict['clutch_nodes']),
+                tuple(tuple(edge) for edge in graph_dict['edges']))
+
+    def _data_hash(self):
+        # The graph is not serialized as an attribute: it has to be taken into account so that gearboxes only
+        # differing by their topology are not merged by the serialization pointers. The digest, unlike hash(),
+        # does not change from one process to another
+        topology_hash = int(hashlib.sha256(json.dumps(self.topology_key()).encode()).hexdigest()[:8], 16)
+        return int((DessiaObject._data_hash(self) + topology_hash) % 1e5)
+
+    def _data_eq(self, other_object):
+        if self.topology_key() != other_object.topology_key():
+            return False
+        eq_dict = self._data_eq_dict()
+        eq_dict.pop('name', None)
+        return dict_data_eq(eq_dict, other_object._data_eq_dict())
+
     def update_gb_graph(self, graph):
         self.graph = graph
         self.ave_l_ns = graph.graph['Average length path/N shafts']
@@ -196,6 +388,88 @@ class GearBox(DessiaObject):
         return [gear, ratio, fuel_consumption_gpkwh,
                 engine_speed, engine_torque]
 
+    def gear_choices(self, cycle_speeds, cycle_torques, stats: 'OptimizerStats' = None):
+        """
+        Array version of gear_choice, evaluating all the gears against all the cycle samples at once.
+
+        :param stats: if given, the time spent in the efficiency map interpolation is added to it
+        :return: gears, ratios, fuel consumptions, engine speeds and engine torques arrays, one value per sample
+        """
+        cycle_speeds = np.asarray(cycle_speeds, dtype=float)
+        cycle_torques = np.asarray(cycle_torques, dtype=float)
+        gear_ratios = np.asarray(self.ratios, dtype=float)[:, None]
+        speed_ranges = np.asarray(self.speed_ranges, dtype=float)
+
+        gears = np.zeros(len(cycle_speeds), dtype=int)
+        ratios = np.zeros(len(cycle_speeds))
+        engine_speeds = np.full(len(cycle_speeds), float(self.engine.setpoint_speed))
+        engine_torques = np.full(len(cycle_speeds), float(self.engine.setpoint_torque))
+        fuel_consumptions = np.full(len(cycle_speeds), self.engine.consumption_efficiency(
+            self.engine.setpoint_speed, self.engine.setpoint_torque))
+
+        moving = cycle_speeds != 0
+        speeds = cycle_speeds[moving]
+        in_range = (speeds >= speed_ranges[:, 0:1]) & (speeds < speed_ranges[:, 1:2])
+        if not in_range.any(axis=0).all():
+            raise ValueError('Some cycle speeds are not covered by any gear speed range')
+
+        gears_engine_speeds = speeds * gear_ratios
+        gears_engine_torques = cycle_torques[moving] / gear_ratios
+        gears_fuel_consumptions = np.full(in_range.shape, np.inf)
+        start = time.perf_counter()
+        gears_fuel_consumptions[in_range] = self.engine.consumption_efficiency(gears_engine_speeds[in_range],
+                                                                              gears_engine_torques[in_range])
+        if stats is not None:
+            stats.interpolation_time += time.perf_counter() - start
+
+        best_gears = np.argmin(gears_fuel_consumptions, axis=0)
+        samples = np.arange(len(speeds))
+        gears[moving] = best_gears + 1
+        ratios[moving] = gear_ratios[best_gears, 0]
+        fuel_consumptions[moving] = gears_fuel_consumptions[best_gears, samples]
+        engine_speeds[moving] = gears_engine_speeds[best_gears, samples]
+        engine_torques[moving] = gears_engine_torques[best_gears, samples]
+        return gears, ratios, fuel_consumptions, engine_speeds, engine_torques
+
+    def batch_gear_choices(self, gear_ratios, cycle_speeds, cycle_torques, stats: 'OptimizerStats' = None):
+        """
+        Version of gear_choices evaluating several sets of gear ratios at once.
+
+        :param gear_ratios: array of shape (number of candidates, number of gears)
+        :param stats: if given, the time spent in the efficiency map interpolation is added to it
+        :return: fuel consumptions and engine torques arrays of shape (number of candidates, number of samples)
+        """
+        gear_ratios = np.asarray(gear_ratios, dtype=float)[:, :, None]
+        cycle_speeds = np.asarray(cycle_speeds, dtype=float)
+        cycle_torques = np.asarray(cycle_torques, dtype=float)
+        speed_ranges = np.asarray(self.speed_ranges, dtype=float)
+
+        shape = (len(gear_ratios), len(cycle_speeds))
+        engine_torques = np.full(shape, float(self.engine.setpoint_torque))
+        fuel_consumptions = np.full(shape, self.engine.consumption_efficiency(
+            self.engine.setpoint_speed, self.engine.setpoint_torque))
+
+        moving = cycle_speeds != 0
+        speeds = cycle_speeds[moving]
+        in_range = (speeds >= speed_ranges[:, 0:1]) & (speeds < speed_ranges[:, 1:2])
+        if not in_range.any(axis=0).all():
+            raise ValueError('Some cycle speeds are not covered by any gear speed range')
+        in_range = np.broadcast_to(in_range, (len(gear_ratios),) + in_range.shape)
+
+        gears_engine_speeds = speeds * gear_ratios
+        gears_engine_torques = cycle_torques[moving] / gear_ratios
+        gears_fuel_consumptions = np.full(in_range.shape, np.inf)
+        start = time.perf_counter()
+        gears_fuel_consumptions[in_range] = self.engine.consumption_efficiency(gears_engine_speeds[in_range],
+                                                                              gears_engine_torques[in_range])
+        if stats is not None:
+            stats.interpolation_time += time.perf_counter() - start
+
+        best_gears = np.argmin(gears_fuel_consumptions, axis=1)[:, None, :]
+        fuel_consumptions[:, moving] = np.take_along_axis(gears_fuel_consumptions, best_gears, axis=1)[:, 0, :]
+        engine_torques[:, moving] = np.take_along_axis(gears_engine_torques, best_gears, axis=1)[:, 0, :]
+        return fuel_consumptions, engine_torques
+
     @plot_data_view(selector='GearBox Graph')
     def plot_data(self):
         gearbox_graph = self.graph
@@ -235,7 +509,7 @@ class GearBox(DessiaObject):
         d['Standard deviation distante input/cluches'] = self.std_clutch_distance
         d['Standard deviation distante input/gears'] = self.std_gears_distance
         d['Density'] = self.density
-        d['graph'] = nx.readwrite.json_graph.node_link_data(self.graph)
+        d['graph'] = self.graph_to_dict(self.graph)
         d['name'] = self.name
         d['ave_l_ns'] = self.ave_l_ns
         d['object_class'] = 'tutorials.tutorial10.GearBox'
@@ -256,7 +530,7 @@ class GearBox(DessiaObject):
         obj = super().dict_to_object(
             dict_=dict_, force_generic=True, global_dict=global_dict, pointers_memo=pointers_memo, path=path)
 
-        obj.graph = nx.readwrite.json_graph.node_link_graph(dict_['graph'])
+        obj._graph_data = dict_['graph']
         obj.average_clutch_distance = dict_['average_clutch_distance']
         obj.average_path_length = dict_['average_path_length']
         obj.number_gears = dict_['number_gears']
@@ -267,44 +541,197 @@ class GearBox(DessiaObject):
         obj.ave_l_ns = dict_['ave_l_ns']
         return obj
 
+    def __deepcopy__(self, memo=None):
+        if memo is None:
+            memo = {}
+        gearbox = self.__class__(copy.deepcopy(self.engine, memo), copy.deepcopy(self.speed_ranges, memo),
+                                 copy.deepcopy(self.ratios, memo), name=self.name)
+        # The graph is not an init argument: it is copied with the graph attributes
+        if self._graph_data is None:
+            gearbox.graph = copy.deepcopy(self._graph, memo)
+        else:
+            gearbox._graph_data = copy.deepcopy(self._graph_data, memo)
+        for attribute in ['average_path_length', 'average_clutch_distance', 'number_shafts', 'number_gears',
+                          'std_clutch_distance', 'std_gears_distance', 'density', 'ave_l_ns']:
+            setattr(gearbox, attribute, getattr(self, attribute))
+        return gearbox
+
+
+def _array_to_block(array: np.ndarray):
+    """
+    Encode an array as a JSON compatible block holding its raw little endian bytes in base64.
+    """
+    array = np.ascontiguousarray(array)
+    dtype = array.dtype.newbyteorder('<')
+    return {'dtype': dtype.str, 'shape': list(array.shape),
+            'data': base64.b64encode(array.astype(dtype, copy=False).tobytes()).decode('ascii')}
+
+
+def _block_to_array(block: Dict[str, Any]):
+    """
+    Decode a block written by _array_to_block.
+    """
+    buffer = bytearray(base64.b64decode(block['data']))
+    return np.frombuffer(buffer, dtype=np.dtype(block['dtype'])).reshape(block['shape'])
+
+
+def lttb_indices(series, number_points: int):
+    """
+    Indices kept by a Largest-Triangle-Three-Buckets downsampling of evenly spaced samples.
+
+    :param series: array of shape (number of samples,) or (number of samples, number of series). With several \
+    series, normalized by their range, the point kept in each bucket maximizes the sum of their triangle areas.
+    :param number_points: number of kept samples, the first and last ones included
+    """
+    series = np.asarray(series, dtype=float)
+    series = series.reshape(len(series), -1)
+    number_samples = len(series)
+    if number_points >= number_samples:
+        return np.arange(number_samples)
+    number_points = max(number_points, 3)
+    value_ranges = np.ptp(series, axis=0)
+    series = (series - series.min(axis=0)) / np.where(value_ranges > 0, value_ranges, 1.)
+
+    bucket_bounds = np.linspace(1, number_samples - 1, number_points - 1).astype(int)
+    indices = np.empty(number_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = number_samples - 1
+    selected = 0
+    for i_bucket in range(number_points - 2):
+        start, end = bucket_bounds[i_bucket], bucket_bounds[i_bucket + 1]
+        next_end = bucket_bounds[i_bucket + 2] if i_bucket + 2 < len(bucket_bounds) else number_samples
+        next_time = (end + next_end - 1) / 2
+        next_values = series[end:next_end].mean(axis=0)
+        times = np.arange(start, end)
+        areas = np.abs((selected - next_time) * (series[start:end] - series[selected])
+                       - (selected - times)[:, None] * (next_values - series[selected])).sum(axis=1)
+        selected = start + int(np.argmax(areas))
+        indices[i_bucket + 1] = selected
+    return indices
+
 
 class GearBoxResults(DessiaObject): 
     _standalone_in_db = True
+    _array_attributes = ['engine_speeds', 'engine_torques', 'fuel_consumptions', 'gears', 'ratios']
+    _non_serializable_attributes = _array_attributes
 
     def __init__(self, gearbox: GearBox, wltp_cycle: WLTPCycle,
                  engine_speeds: List[float],
                  engine_torques: List[float], 
                  fuel_consumptions: List[float],
-                 gears: List[float], ratios: List[float],
+                 gears: List[int], ratios: List[float],
                  average_fuel_consumption: float,
+                 max_plot_points: int = None,
                  name: str = ''):
+        """
+        :param max_plot_points: number of cycle samples displayed by the plots, chosen by a shape preserving \
+        downsampling. All the samples are displayed if not given.
+        """
         self.gearbox = gearbox
         self.wltp_cycle = wltp_cycle
-        self.engine_speeds = engine_speeds
-        self.engine_torques = engine_torques
-        self.fuel_consumptions = fuel_consumptions
-        self.gears = gears
-        self.ratios = ratios
+        self.engine_speeds = np.asarray(engine_speeds, dtype=float)
+        self.engine_torques = np.asarray(engine_torques, dtype=float)
+        self.fuel_consumptions = np.asarray(fuel_consumptions, dtype=float)
+        self.gears = np.asarray(gears, dtype=int)
+        self.ratios = np.asarray(ratios, dtype=float)
         self.average_fuel_consumption = average_fuel_consumption
+        self.max_plot_points = max_plot_points
         DessiaObject.__init__(self,name=name)
+        self._plot_points = None
         
-        self.average_engine_speed = mean(self.engine_speeds)
-        self.average_engine_torque = mean(self.engine_torques)
+        self.average_engine_speed = float(np.mean(self.engine_speeds))
+        self.average_engine_torque = float(np.mean(self.engine_torques))
         self.ratio_min = min(self.gearbox.ratios)
         self.ratio_max = max(self.gearbox.ratios)
         self.average_ratio = mean(self.gearbox.ratios)
 
+    def to_dict(self, use_pointers: bool = True, memo=None, path: str = "#", id_method=True, id_memo=None):
+        """
+        Serialize the results, the cycle arrays being stored as base64 binary blocks.
+        """
+        d = super().to_dict(use_pointers=use_pointers, memo=memo, path=path, id_method=id_method, id_memo=id_memo)
+        for attribute in self._array_attributes:
+            d[attribute] = _array_to_block(getattr(self, attribute))
+        return d
+
+    @classmethod
+    def dict_to_object(
+            cls,
+            dict_,
+            force_generic: bool = False,
+            global_dict=None,
+            pointers_memo: Dict[str, Any] = None,
+            path: str = "#",):
+        """
+        Deserialize results, accepting cycle arrays either as binary blocks or as plain lists.
+        """
+        if pointers_memo is None or global_dict is None:
+            global_dict, pointers_memo = update_pointers_data(global_dict=global_dict, current_dict=dict_,
+                                                              pointers_memo=pointers_memo)
+        gearbox = deserialize(dict_['gearbox'], global_dict=global_dict, pointers_memo=pointers_memo,
+                              path=f'{path}/gearbox')
+        wltp_cycle = deserialize(dict_['wltp_cycle'], global_dict=global_dict, pointers_memo=pointers_memo,
+                                 path=f'{path}/wltp_cycle')
+        arrays = {attribute: _block_to_array(dict_[attribute]) if isinstance(dict_[attribute], dict)
+                  else dict_[attribute] for attribute in cls._array_attributes}
+        return cls(gearbox=gearbox, wltp_cycle=wltp_cycle, average_fuel_consumption=dict_['average_fuel_consumption'],
+                   max_plot_points=dict_.get('max_plot_points'), name=dict_.get('name', ''), **arrays)
+
+    def _data_hash(self):
+        # Cycle arrays are not serialized as attributes: they are hashed apart
+        arrays_hash = sum(choose_hash(getattr(self, attribute).tolist()) for attribute in self._array_attributes)
+        return int((DessiaObject._data_hash(self) + arrays_hash) % 1e5)
+
+    def _data_eq(self, other_object):
+        for attribute in self._array_attributes:
+            array, other_array = getattr(self, attribute), getattr(other_object, attribute)
+            if array.shape != other_array.shape or not np.allclose(array, other_array, rtol=0., atol=FLOAT_TOLERANCE):
+                return False
+        eq_dict = self._data_eq_dict()
+        eq_dict.pop('name', None)
+        return dict_data_eq(eq_dict, other_object._data_eq_dict())
+
+    def __deepcopy__(self, memo=None):
+        if memo is None:
+            memo = {}
+        arrays = {attribute: getattr(self, attribute).copy() for attribute in self._array_attributes}
+        return self.__class__(gearbox=copy.deepcopy(self.gearbox, memo),
+                              wltp_cycle=copy.deepcopy(self.wltp_cycle, memo),
+                              average_fuel_consumption=self.average_fuel_consumption,
+                              max_plot_points=self.max_plot_points, name=self.name, **arrays)
+
+    def plot_indices(self):
+        """
+        Indices of the cycle samples displayed by the plots.
+        """
+        number_samples = len(self.wltp_cycle.cycle_speeds[:-1])
+        if self.max_plot_points is None or self.max_plot_points >= number_samples:
+            return np.arange(number_samples)
+        series = np.column_stack([self.wltp_cycle.cycle_speeds[:-1], self.wltp_cycle.cycle_torques,
+                                  self.engine_speeds, self.engine_torques, self.fuel_consumptions, self.gears])
+        return lttb_indices(series, self.max_plot_points)
+
     def _to_plot_point(self):
+        """
+        Plot samples of the displayed cycle samples, built once and shared by the plots.
+        """
+        if self._plot_points is not None and self._plot_points[0] == self.max_plot_points:
+            return self._plot_points[1]
+
         points = []
-        cycle_time = [i+1 for i in range(len(self.wltp_cycle.cycle_speeds[:-1]))]
-        for i, (car_speed, wheel_torque, engine_speed, engine_torque, fuel_consumption, time, gear) in\
-                enumerate(zip(self.wltp_cycle.cycle_speeds[:-1], self.wltp_cycle.cycle_torques, self.engine_speeds,
-                    self.engine_torques, self.fuel_consumptions, cycle_time, self.gears)):
+        indices = self.plot_indices()
+        cycle_speeds = np.asarray(self.wltp_cycle.cycle_speeds, dtype=float)
+        cycle_torques = np.asarray(self.wltp_cycle.cycle_torques, dtype=float)
+        for car_speed, wheel_torque, engine_speed, engine_torque, fuel_consumption, cycle_time, gear in\
+                zip(cycle_speeds[indices].tolist(), cycle_torques[indices].tolist(),
+                    self.engine_speeds[indices].tolist(), self.engine_torques[indices].tolist(),
+                    self.fuel_consumptions[indices].tolist(), (indices + 1).tolist(), self.gears[indices].tolist()):
 
             data = {'c_s': car_speed, 'whl_t': wheel_torque, 'w_e': engine_speed, 't_e': engine_torque,
-                    'f_cons (g/kWh)': fuel_consumption*3.6e9, 'time': time, 'gear': gear}
+                    'f_cons (g/kWh)': fuel_consumption*3.6e9, 'time': cycle_time, 'gear': gear}
             points.append(plot_data.Sample(values=data))
 
+        self._plot_points = (self.max_plot_points, points)
         return points
 
     @plot_data_view(selector="MultiPlot 1")
@@ -350,7 +777,6 @@ class GearBoxResults(DessiaObject):
     @plot_data_view(selector="MultiPlot 2")
     def plot_data_2(self):
 
-        cycle_time = [i+1 for i in range(len(self.wltp_cycle.cycle_speeds[:-1]))]
         points = self._to_plot_point()
         list_colors = [BLUE, BROWN, GREEN, BLACK]
         graphs2d = []
@@ -361,8 +787,8 @@ class GearBoxResults(DessiaObject):
         edge_style = plot_data.EdgeStyle(line_width=0.5,
                                          color_stroke=list_colors[0])
         elements = []
-        for i, gear in enumerate(self.gears):
-            elements.append({'sec': cycle_time[i], 'gear': gear})         
+        for point in points:
+            elements.append({'sec': point.values['time'], 'gear': point.values['gear']})         
         dataset = plot_data.Dataset(elements=elements,
                                     edge_style=edge_style,
                                     tooltip=tooltip,
@@ -375,10 +801,8 @@ class GearBoxResults(DessiaObject):
         edge_style = plot_data.EdgeStyle(line_width=0.5,
                                          color_stroke=list_colors[0])
         elements = []
-        for i, gear in enumerate(self.gears):
-            point = {'sec': cycle_time[i],
-                     'f_cons (g/kWh)': self.fuel_consumptions[i]*3.6e9}
-            elements.append(point)
+        for point in points:
+            elements.append({'sec': point.values['time'], 'f_cons (g/kWh)': point.values['f_cons (g/kWh)']})
         dataset = plot_data.Dataset(elements=elements,
                                     edge_style=edge_style,
                                     tooltip=tooltip,
@@ -391,9 +815,8 @@ class GearBoxResults(DessiaObject):
         edge_style = plot_data.EdgeStyle(line_width=0.5,
                                          color_stroke=list_colors[2])
         elements = []
-        for i, torque in enumerate(self.wltp_cycle.cycle_torques):
-            point = {'sec': cycle_time[i], 'w_e': self.engine_speeds[i]}
-            elements.append(point)
+        for point in points:
+            elements.append({'sec': point.values['time'], 'w_e': point.values['w_e']})
         dataset = plot_data.Dataset(elements=elements,
                                     edge_style=edge_style,
                                     tooltip=tooltip,
@@ -406,9 +829,8 @@ class GearBoxResults(DessiaObject):
         edge_style = plot_data.EdgeStyle(line_width=0.5,
                                          color_stroke=list_colors[3])
         elements = []
-        for i, torque in enumerate(self.wltp_cycle.cycle_torques):
-            point = {'sec': cycle_time[i], 'w_t': self.engine_torques[i]}
-            elements.append(point)
+        for point in points:
+            elements.append({'sec': point.values['time'], 'w_t': point.values['t_e']})
         dataset = plot_data.Dataset(elements=elements,
                                     edge_style=edge_style,
                                     tooltip=tooltip,
@@ -428,18 +850,80 @@ class GearBoxResults(DessiaObject):
         return multiplot2
 
 
+class OptimizerStats(DessiaObject):
+    """
+    Instrumentation of a GearBoxOptimizer: objective calls, cache hits, timings and convergence of each restart.
+
+    simulation_time is the time spent simulating the cycle in objective calls, interpolation_time being the part of \
+    it spent in the efficiency map interpolation.
+    """
+    _standalone_in_db = False
+    counters = ['objective_calls', 'cache_hits', 'simulation_time', 'interpolation_time']
+
+    def __init__(self, objective_calls: int = 0, cache_hits: int = 0, simulation_time: float = 0.,
+                 interpolation_time: float = 0., restarts: List[Dict[str, float]] = None, name: str = ''):
+        self.objective_calls = objective_calls
+        self.cache_hits = cache_hits
+        self.simulation_time = simulation_time
+        self.interpolation_time = interpolation_time
+        self.restarts = [] if restarts is None else restarts
+        DessiaObject.__init__(self, name=name)
+
+    def cache_hit_rate(self):
+        if not self.objective_calls:
+            return 0.
+        return self.cache_hits / self.objective_calls
+
+    def snapshot(self):
+        return {counter: getattr(self, counter) for counter in self.counters}
+
+    def restart_record(self, snapshot: Dict[str, float], solution):
+        """
+        Counters spent since the snapshot and convergence of the restart solution.
+        """
+        record = {counter: getattr(self, counter) - snapshot[counter] for counter in self.counters}
+        record.update({'fun': float(solution.fun), 'success': bool(solution.success),
+                       'iterations': int(solution.nit), 'function_evaluations': int(solution.nfev)})
+        return record
+
+    def add_restart(self, record: Dict[str, float], add_counters: bool = False):
+        """
+        Store a restart record, adding its counters to the totals if it comes from another process.
+        """
+        self.restarts.append(record)
+        if add_counters:
+            for counter in self.counters:
+                setattr(self, counter, getattr(self, counter) + record[counter])
+
+
 class GearBoxOptimizer(DessiaObject):
     _standalone_in_db = True
+    _non_serializable_attributes = ['engine_speeds', 'engine_torques', 'fuel_consumptions', 'gears', 'ratios']
+    _non_data_eq_attributes = ['name', 'stats']
     
     def __init__(self, gearbox: GearBox, wltp_cycle: WLTPCycle,
                  first_gear_ratio_min_max: Tuple[float, float],
                  coeff_between_gears: List[Tuple[float, float]] = None, 
-                 name: str = ''):
+                 vectorized: bool = True, cache_size: int = 0, cache_decimals: int = 12,
+                 batch_gradient: bool = True, name: str = ''):
+        """
+        :param cache_size: number of objective values memoized, keyed by the design vector rounded to \
+        cache_decimals. 0 disables the memoization. The simulation state is not updated on cache hits. \
+        objective_gradient values and gradients are memoized in the same way.
+        :param batch_gradient: minimize with objective_gradient instead of letting scipy estimate the gradient \
+        with one objective call per design variable. Only used if vectorized.
+        """
         self.gearbox = gearbox
         self.wltp_cycle = wltp_cycle
         self.coeff_between_gears = coeff_between_gears
         self.first_gear_ratio_min_max = first_gear_ratio_min_max
+        self.vectorized = vectorized
+        self.cache_size = cache_size
+        self.cache_decimals = cache_decimals
+        self.batch_gradient = batch_gradient
         DessiaObject.__init__(self, name=name)
+        self.stats = OptimizerStats()
+        self._objective_cache = OrderedDict()
         
         if self.coeff_between_gears is None:
             self.coeff_between_gears = (len(self.gearbox.speed_ranges)-1)*[[0.5,1]]
@@ -454,29 +938,60 @@ class GearBoxOptimizer(DessiaObject):
                                self.coeff_between_gears[i-1][1]])
         self.bounds = bounds
   
+    def _cache_key(self, x):
+        return tuple(np.round(np.asarray(x, dtype=float), self.cache_decimals).tolist())
+
+    def _cached_value(self, key):
+        """
+        Value memoized under the key, or None if there is none.
+        """
+        if key not in self._objective_cache:
+            return None
+        self._objective_cache.move_to_end(key)
+        self.stats.cache_hits += 1
+        return self._objective_cache[key]
+
+    def _memoize(self, key, value):
+        self._objective_cache[key] = value
+        if len(self._objective_cache) > self.cache_size:
+            self._objective_cache.popitem(last=False)
+
     def objective(self, x):
+        self.stats.objective_calls += 1
+        if self.cache_size:
+            key = self._cache_key(x)
+            objective_function = self._cached_value(key)
+            if objective_function is not None:
+                return objective_function
+
+        start = time.perf_counter()
         self.update(x)
+        self.stats.simulation_time += time.perf_counter() - start
         objective_function = 0
         
-        objective_function += mean(self.fuel_consumptions) 
-        
-        for engine_torque in self.engine_torques:
-            if engine_torque > max(self.gearbox.engine.efficiency_map.engine_torques):
-                objective_function += 1000
+        objective_function += float(np.mean(self.fuel_consumptions))
+
+        max_engine_torque = self.gearbox.engine.efficiency_map.max_torque
+        objective_function += 1000*int(np.count_nonzero(np.asarray(self.engine_torques) > max_engine_torque))
 
+        if self.cache_size:
+            self._memoize(key, objective_function)
         return objective_function    
     
     def update(self, x):
         self.gearbox.update(x)
-        
+        if self.vectorized:
+            self.simulate()
+            return
+
         fuel_consumptions = []
         gears = []
         ratios = []
         engine_speeds = []
         engine_torques = []
         
-        for (cycle_speed, cycle_torque) in zip(self.wltp_cycle.cycle_speeds, self.wltp_cycle.cycle_torques): 
-            cycle_speed = cycle_speed*2/self.wltp_cycle.tire_radius
+        for (cycle_speed, cycle_torque) in zip(self.wltp_cycle.wheel_speeds.tolist(),
+                                               self.wltp_cycle.cycle_torques.tolist()):
             gear_choice = self.gearbox.gear_choice(cycle_speed, cycle_torque)
             gears.append(gear_choice[0])
             ratios.append(gear_choice[1])
@@ -491,27 +1006,125 @@ class GearBoxOptimizer(DessiaObject):
         self.ratios = ratios
         self.fuel_consumptions = fuel_consumptions
 
+    def cycle_arrays(self):
+        """
+        Wheel rotation speeds and wheel torques of the cycle samples, as seen by the gearbox.
+        """
+        return self.wltp_cycle.wheel_speeds, self.wltp_cycle.wheel_torques
+
+    def simulate(self):
+        """
+        Simulate the whole cycle with the current gearbox ratios in a single array computation.
+        """
+        cycle_speeds, cycle_torques = self.cycle_arrays()
+        gears, ratios, fuel_consumptions, engine_speeds, engine_torques = self.gearbox.gear_choices(
+            cycle_speeds, cycle_torques, self.stats)
+        self.engine_speeds = engine_speeds
+        self.engine_torques = engine_torques
+        self.gears = gears
+        self.ratios = ratios
+        self.fuel_consumptions = fuel_consumptions
+
+    def evaluate_batch(self, X, chunk_size: int = 16, stats: OptimizerStats = None):
+        """
+        Objective values of many design vectors, simulated together on the cycle.
+
+        :param X: array of shape (number of candidates, number of gears), each row being an x given to objective
+        :param chunk_size: number of candidates simulated at once, memory use growing with \
+        chunk_size * number of gears * number of cycle samples
+        :param stats: if given, the time spent in the efficiency map interpolation is added to it
+        :return: objective values and mean fuel consumptions arrays, one value per candidate
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        gear_ratios = np.cumprod(X, axis=1)
+        cycle_speeds, cycle_torques = self.cycle_arrays()
+        max_engine_torque = self.gearbox.engine.efficiency_map.max_torque
+
+        objectives = np.empty(len(X))
+        mean_fuel_consumptions = np.empty(len(X))
+        for start in range(0, len(X), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            fuel_consumptions, engine_torques = self.gearbox.batch_gear_choices(gear_ratios[chunk], cycle_speeds,
+                                                                                cycle_torques, stats)
+            mean_fuel_consumptions[chunk] = np.mean(fuel_consumptions, axis=1)
+            objectives[chunk] = mean_fuel_consumptions[chunk] \
+                + 1000*np.count_nonzero(engine_torques > max_engine_torque, axis=1)
+        return objectives, mean_fuel_consumptions
+
+    def objective_gradient(self, x):
+        """
+        Objective value and its forward finite differences gradient, the design vector and all its perturbations \
+        being simulated in a single batch.
+
+        Steps are the ones scipy uses for its own estimation, flipped backward when they would leave the bounds.
+        """
+        self.stats.objective_calls += 1
+        if self.cache_size:
+            # Not mixed up with the objective values of the same design vector
+            key = ('gradient',) + self._cache_key(x)
+            objective_gradient = self._cached_value(key)
+            if objective_gradient is not None:
+                return objective_gradient
+
+        x = np.asarray(x, dtype=float)
+        lower_bounds, upper_bounds = np.asarray(self.bounds, dtype=float).T
+        steps = np.sqrt(np.finfo(float).eps)*np.where(x >= 0, 1., -1.)*np.maximum(1., np.abs(x))
+        violated = (x + steps < lower_bounds) | (x + steps > upper_bounds)
+        fitting = np.abs(steps) <= np.maximum(upper_bounds - x, x - lower_bounds)
+        steps[violated & fitting] *= -1
+        steps = (x + steps) - x
+
+        start = time.perf_counter()
+        objectives, _ = self.evaluate_batch(np.vstack([x, x + np.diag(steps)]), chunk_size=len(x) + 1,
+                                            stats=self.stats)
+        self.stats.simulation_time += time.perf_counter() - start
+        objective_gradient = float(objectives[0]), (objectives[1:] - objectives[0])/steps
+
+        if self.cache_size:
+            self._memoize(key, objective_gradient)
+        return objective_gradient
+
     def cond_init(self):
-        x0 = []
-        for interval in self.bounds:
-                x0.append((interval[1]-interval[0])*float(np.random.random(1))+interval[0])
-        return x0
-    
-    def optimize(self, max_loops:int = 1000): 
-        valid = True
-        count = 0
+        return random_point(self.bounds)
+
+    def restart(self, x0):
+        self.update(x0)
+        if self.vectorized and self.batch_gradient:
+            return minimize(self.objective_gradient, x0, jac=True, bounds=self.bounds)
+        return minimize(self.objective, x0, bounds = self.bounds)
+
+    def seeded_restart(self, restart_seed: np.random.SeedSequence = None):
+        """
+        Restart from the random stream of restart_seed, returning the solution and its statistics record.
+        """
+        snapshot = self.stats.snapshot()
+        sol = self.restart(random_point(self.bounds, restart_seed))
+        return list(sol.x), float(sol.fun), bool(sol.success), self.stats.restart_record(snapshot, sol)
+
+    def optimize(self, max_loops: int = 1000, n_workers: int = 1, seed: int = None):
+        """
+        Run max_loops independent minimizations from random start points.
+
+        Statistics of the run are gathered in the stats attribute.
+        """
+        self.stats = OptimizerStats()
+        self._objective_cache.clear()
+        seeds = restart_seeds(max_loops, seed, n_workers)
+        solutions = []
+        for x, fun, success, record in ordered_map(self, 'seeded_restart', seeds, n_workers):
+            # Counters of the restarts run by workers were gathered in their own copy of the stats
+            self.stats.add_restart(record, add_counters=n_workers != 1)
+            solutions.append((x, fun, success))
+
+        max_bsfc = self.gearbox.engine.efficiency_map.max_bsfc
         list_gearbox_results = []
-        
-        while valid and count < max_loops:
-            x0 = self.cond_init()
-            self.update(x0)
-            sol = minimize(self.objective, x0, bounds = self.bounds)
-            count += 1
-            if sol.fun < max([j for i in self.gearbox.engine.efficiency_map.bsfc for j in i]) and sol.success:
-                self.average_fuel_consumption = float(sol.fun)
-                self.update(list(sol.x))
-                gearbox = self.gearbox.copy()
-                gearbox.ratios = self.gearbox.ratios
+        for x, fun, success in solutions:
+            if fun < max_bsfc and success:
+                self.average_fuel_consumption = fun
+                self.update(x)
+                # Results share the engine and the cycle of the optimizer instead of holding copies
+                gearbox = self.gearbox.copy(memo={id(self.gearbox.engine): self.gearbox.engine})
+                gearbox.ratios = list(self.gearbox.ratios)
                 gearbox_results = GearBoxResults(gearbox,
                                                  self.wltp_cycle,
                                                  self.engine_speeds,
@@ -523,8 +1136,151 @@ class GearBoxOptimizer(DessiaObject):
                 list_gearbox_results.append(gearbox_results)
                 
         return list_gearbox_results
-    
-    
+
+
+class GearBoxTopology:
+    """
+    Integer indexed view of a gearbox graph, to analyse clutch combinations without copying the graph
+    """
+    def __init__(self, graph: nx.Graph):
+        self.graph = graph
+        self.nodes = list(graph.nodes())
+        self.edges = list(graph.edges())
+        self.node_indices = {node: i for i, node in enumerate(self.nodes)}
+        self.node_types = [graph.nodes()[node].get('Node Type') for node in self.nodes]
+        self.neighbors = [[self.node_indices[neighbor] for neighbor in graph.adj[node]] for node in self.nodes]
+        self.input_shaft = self.nodes[self.node_types.index('Input Shaft')]
+        self.output_shaft = self.nodes[self.node_types.index('Output Shaft')]
+
+        self._input_distances = len(self.nodes)*[None]
+        input_index = self.node_indices[self.input_shaft]
+        self._input_distances[input_index] = 0
+        queue = deque([input_index])
+        while queue:
+            index = queue.popleft()
+            for neighbor in self.neighbors[index]:
+                if self._input_distances[neighbor] is None:
+                    self._input_distances[neighbor] = self._input_distances[index] + 1
+                    queue.append(neighbor)
+
+    def input_distances(self, nodes):
+        """
+        Shortest path lengths from the input shaft to the given nodes, in graph order.
+        """
+        return [self._input_distances[i] for i, node in enumerate(self.nodes) if node in nodes]
+
+    def is_connected(self, node1, node2, removed_edges=()):
+        """
+        Whether the two nodes are connected once the given edges are removed.
+        """
+        removed_edges = {frozenset((self.node_indices[edge[0]], self.node_indices[edge[1]])) for edge in removed_edges}
+        target = self.node_indices[node2]
+        visited = {self.node_indices[node1]}
+        queue = deque(visited)
+        while queue:
+            index = queue.popleft()
+            if index == target:
+                return True
+            for neighbor in self.neighbors[index]:
+                if neighbor not in visited and frozenset((index, neighbor)) not in removed_edges:
+                    visited.add(neighbor)
+                    queue.append(neighbor)
+        return False
+
+
+class TopologyCache:
+    """
+    Content addressed on-disk cache of generated gearbox graphs.
+
+    Each entry is a gzipped JSON file named after the hash of the generation parameters. The least recently used \
+    entries are removed once the directory holds more than max_size bytes.
+    """
+    version = 1
+    extension = '.json.gz'
+
+    def __init__(self, directory: str, max_size: int = 100*2**20):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, **parameters):
+        parameters['version'] = self.version
+        return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key: str):
+        return os.path.join(self.directory, key + self.extension)
+
+    def load(self, key: str):
+        """
+        Graphs stored under the key, or None if there is no valid entry.
+        """
+        path = self.path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                data = json.load(file)
+            if data['version'] != self.version or data['key'] != key:
+                raise ValueError('Outdated topology cache entry')
+            graphs = []
+            for graph_data in data['graphs']:
+                graph = nx.Graph(**graph_data['graph'])
+                graph.add_nodes_from(graph_data['nodes'])
+                graph.add_edges_from(graph_data['edges'])
+                graphs.append(graph)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, zlib.error, ValueError, KeyError, TypeError):
+            # Corrupted or truncated entry, for instance left by a killed process
+            self.remove(path)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return graphs
+
+    def save(self, key: str, graphs: List[nx.Graph]):
+        os.makedirs(self.directory, exist_ok=True)
+        data = {'version': self.version, 'key': key,
+                'graphs': [{'graph': graph.graph,
+                            'nodes': [[node, attributes] for node, attributes in graph.nodes(data=True)],
+                            'edges': [[node1, node2, attributes]
+                                      for node1, node2, attributes in graph.edges(data=True)]}
+                           for graph in graphs]}
+        path = self.path(key)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(temporary_path, 'wt', encoding='utf-8') as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.replace(temporary_path, path)
+        self.evict(keep=path)
+
+    @staticmethod
+    def remove(path: str):
+        """
+        Remove an entry file, unless another process already did.
+        """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep: str = None):
+        """
+        Remove the least recently used entries until the cache fits in max_size.
+        """
+        entries = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(self.extension):
+                path = os.path.join(self.directory, file_name)
+                entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            if path != keep:
+                self.remove(path)
+                size -= entry_size
+
+
 class GearBoxGenerator(DessiaObject):
     _standalone_in_db = True
 
@@ -537,47 +1293,136 @@ class GearBoxGenerator(DessiaObject):
         self.max_number_gears = max_number_gears
         DessiaObject.__init__(self, name=name)
 
-    def generate_connections(self):
-        list_node = []
-        connections = []
-        list_dict_connections = []
+    def generate_connections(self, n_workers: int = 1):
+        return list(self.iter_connections(n_workers))
 
+    def shaft_connections(self):
+        """
+        Possible connections between two shafts, the last one (None) standing for no gear.
+        """
+        connections = []
         for i in range(self.max_number_shaft_assemblies):
             for j in range(self.max_number_shaft_assemblies):
                 if i < j:
                     connections.append((i + 1, j + 1))
         connections.append(None)
-        for gear in range(self.max_number_gears):
-            list_node.append(len(connections))
-        tree = dt.RegularDecisionTree(list_node)
+        return connections
+
+    def iter_connections(self, n_workers: int = 1, partition_depth: int = 2):
+        """
+        Lazily enumerate the gear connections between shafts, as dicts {gear name: (shaft 1, shaft 2)}.
+
+        Only the first ordering of each set of connections is enumerated: the other ones give isomorphic graphs.
+        The tree is split into partitions of the first partition_depth gears, enumerated independently by \
+        n_workers processes and merged back in order.
+        """
+        connections = self.shaft_connections()
+        partitions = self.connection_partitions(min(partition_depth, self.max_number_gears - 1))
+        if n_workers == 1:
+            partitions_connections = (self.partition_connections(prefix) for prefix in partitions)
+        else:
+            executor = object_pool(self, n_workers)
+            futures = [executor.submit(call_worker_method, 'partition_connections', prefix) for prefix in partitions]
+            partitions_connections = (future.result() for future in futures)
+
+        try:
+            seen_gears_connections = set()
+            for partition_connections in partitions_connections:
+                for new_node in partition_connections:
+                    gears_connections = tuple(sorted(new_node))
+                    if gears_connections in seen_gears_connections:
+                        continue
+                    seen_gears_connections.add(gears_connections)
+                    dict_connections = {}
+                    for i_node, nd in enumerate(new_node):
+                        dict_connections['G' + str(i_node + 1)] = connections[nd]
+                    yield dict_connections
+        finally:
+            if n_workers != 1:
+                # Partitions not started yet are dropped when the enumeration is stopped early
+                shutdown(executor, futures)
+
+    def connection_partitions(self, depth: int):
+        """
+        Valid nodes of the connections decision tree at the given depth, in enumeration order.
+        """
+        if depth == 0:
+            return [()]
+        connections = self.shaft_connections()
+        tree = dt.RegularDecisionTree(depth*[len(connections)])
+        seen_prefixes = set()
+        partitions = []
         while not tree.finished:
-            valid = True
             node = tree.current_node
-            new_node = []
-            for nd in node:
-                if nd != len(connections) - 1:
-                    new_node.append(nd)
-            if len(new_node) > 1:
-                if connections[new_node[-1]][0] != connections[new_node[-2]][0]:
-                    if connections[new_node[-1]][0] != \
-                            connections[new_node[-2]][1]:
-                        valid = False
-            if len(new_node) == 0:
-                valid = False
+            valid = self._valid_connections_node(node, connections, seen_prefixes)
+            if len(node) == depth and valid:
+                partitions.append(tuple(node))
+            tree.NextNode(valid)
+        return partitions
+
+    def partition_connections(self, prefix):
+        """
+        Connection indices of the valid leaves of the decision tree starting with prefix, one per set of connections.
+        """
+        connections = self.shaft_connections()
+        tree = dt.RegularDecisionTree((self.max_number_gears - len(prefix))*[len(connections)])
+        seen_prefixes = set()
+        seen_gears_connections = set()
+        list_connections = []
+        while not tree.finished:
+            node = list(prefix) + tree.current_node
+            valid = self._valid_connections_node(node, connections, seen_prefixes)
             if len(node) == self.max_number_gears and valid:
-                dict_connections = {}
-                for i_node, nd in enumerate(new_node):
-                    dict_connections['G' + str(i_node + 1)] = connections[nd]
-                list_dict_connections.append(dict_connections)
+                new_node = tuple(nd for nd in node if nd != len(connections) - 1)
+                gears_connections = tuple(sorted(new_node))
+                if gears_connections not in seen_gears_connections:
+                    seen_gears_connections.add(gears_connections)
+                    list_connections.append(new_node)
             tree.NextNode(valid)
-        return list_dict_connections
+        return list_connections
+
+    @staticmethod
+    def _valid_connections_node(node, connections, seen_prefixes):
+        """
+        Check a node of the connections decision tree, pruning redundant subtrees:
+
+        * "no gear" choices can only be followed by other "no gear" choices, which gives the first ordering of \
+        the same set of gears
+        * a node having the same set of gears and the same last gear as a previous one has the same valid \
+        completions, all giving permutations of previous sets of gears
+        """
+        new_node = []
+        for nd in node:
+            if nd != len(connections) - 1:
+                new_node.append(nd)
+        if len(new_node) == 0:
+            return False
+        if node[-1] == len(connections) - 1:
+            return True
+        if len(new_node) != len(node):
+            return False
+        if len(new_node) > 1:
+            if connections[new_node[-1]][0] != connections[new_node[-2]][0]:
+                if connections[new_node[-1]][0] != \
+                        connections[new_node[-2]][1]:
+                    return False
+        prefix_key = (tuple(sorted(new_node)), new_node[-1])
+        if prefix_key in seen_prefixes:
+            return False
+        seen_prefixes.add(prefix_key)
+        return True
 
     def generate_paths(self, list_gearbox_connections):
-        # list_gearbox_connections = self.generate_connections()
-        list_gearbox_graphs = []
-        list_paths = []
-        list_paths_edges = []
-        list_dict_connections = []
+        return list(self.iter_paths(list_gearbox_connections))
+
+    def iter_paths(self, list_gearbox_connections):
+        """
+        Lazily build the graphs of the connections having one path per speed range, skipping isomorphic ones.
+        """
+        # Accepted graphs indexed by a node-type-aware Weisfeiler-Lehman hash: isomorphic graphs share the same hash,
+        # so full isomorphism checks are only needed inside a bucket
+        graphs_by_hash = {}
+        node_match = iso.categorical_node_match('Node Type', 'Shaft')
         for gearbox_connections in list_gearbox_connections:
             gearbox_graph = nx.Graph()
             for gearbox_connection in gearbox_connections:
@@ -616,9 +1461,6 @@ class GearBoxGenerator(DessiaObject):
                 paths.append(path)
                 average_lengths.append(len(path))
                 count += 1
-            paths_edges = []
-            for path in map(nx.utils.pairwise, paths):
-                paths_edges.append(list(path))
 
             if count == len(self.gearbox.speed_ranges):
                 valid = True
@@ -631,13 +1473,16 @@ class GearBoxGenerator(DessiaObject):
                         gears_path_lengths.append(
                             nx.shortest_path_length(gearbox_graph, input_shaft,
                                                     node))
-                for graph in list_gearbox_graphs:
-                    node_match = iso.categorical_node_match('Node Type',
-                                                            'Shaft')
-                    if nx.is_isomorphic(gearbox_graph, graph,
-                                        node_match=node_match):
-                        valid = False
+                graph_hash = None
                 if valid:
+                    graph_hash = nx.weisfeiler_lehman_graph_hash(gearbox_graph, node_attr='Node Type')
+                    for graph in graphs_by_hash.get(graph_hash, []):
+                        if nx.is_isomorphic(gearbox_graph, graph,
+                                            node_match=node_match):
+                            valid = False
+                            break
+                if valid:
+                    graphs_by_hash.setdefault(graph_hash, []).append(gearbox_graph)
                     gearbox_graph.graph['Average length path/N shafts'] = mean(
                         average_lengths) / number_shafts
                     gearbox_graph.graph['Average length path'] = mean(
@@ -646,12 +1491,7 @@ class GearBoxGenerator(DessiaObject):
                     gearbox_graph.graph['Number of gears'] = number_gears
                     # gearbox_graph.graph['Standard deviation distante input/gears'] = np.std(gears_path_lengths)
                     gearbox_graph.graph['Density'] = nx.density(gearbox_graph)
-                    list_gearbox_graphs.append(gearbox_graph)
-                    list_paths.append(paths)
-                    list_paths_edges.append(paths_edges)
-                    list_dict_connections.append(gearbox_connections)
-
-        return list_gearbox_graphs  # , list_paths, list_paths_edges, list_counter_paths_between_2shafts,list_dict_connections
+                    yield gearbox_graph
 
     def clutch_analisys(self, list_path_generated_graphs):
         new_list_gearbox_graphs = []
@@ -659,135 +1499,167 @@ class GearBoxGenerator(DessiaObject):
         list_cycles = []
         list_dict_clutch_connections = []
         for graph in list_path_generated_graphs:
-            for node in graph.nodes():
-                if graph.nodes()[node]:
-                    if graph.nodes()[node]['Node Type'] == 'Input Shaft':
-                        input_shaft = node
-            cycles = nx.cycle_basis(graph, root=input_shaft)
+            topology = GearBoxTopology(graph)
+            cycles, clutch_combinations = self.clutch_cycles(topology)
+            clutch_combinations = list(clutch_combinations)
             list_cycles.append(cycles)
-            list_cycle_shafts = []
-            for cycle in cycles:
-                cycle_shafts = []
-                for node in cycle:
-                    if 'S' in node:
-                        cycle_shafts.append(node)
-                list_cycle_shafts.append(cycle_shafts)
-            clutch_combinations = list(product(*list_cycle_shafts))
             list_clutch_combinations.append(clutch_combinations)
             for clutch_combination in clutch_combinations:
-                graph_copy = copy.deepcopy(graph)
-                dict_clutch_connections = {}
-                for i_cycle, cycle in enumerate(cycles):
-                    for i_node, node in enumerate(cycle):
-                        if clutch_combination[i_cycle] == node:
-                            if clutch_combination[i_cycle] == cycle[-1]:
-                                dict_clutch_connections[i_cycle + 1] = (
-                                cycle[0], cycle[i_node - 1])
-                                graph_copy.nodes()[node]['Clutch'] = True
-                                graph_copy.add_edges_from(
-                                    [(cycle[0], node, {'Clutch': True}), (
-                                    cycle[i_node - 1], node,
-                                    {'Clutch': True})])
-                            else:
-                                dict_clutch_connections[i_cycle + 1] = (
-                                cycle[i_node + 1], cycle[i_node - 1])
-                                graph_copy.nodes()[node]['Clutch'] = True
-                                graph_copy.add_edges_from([(cycle[i_node + 1],
-                                                            node,
-                                                            {'Clutch': True}),
-                                                           (cycle[i_node - 1],
-                                                            node,
-                                                            {'Clutch': True})])
-                clutch_path_lengths = []
-                for node in graph_copy.nodes():
-                    if 'Clutch' in list(graph_copy.nodes()[node].keys()):
-                        clutch_path_lengths.append(
-                            nx.shortest_path_length(graph_copy, input_shaft,
-                                                    node))
-                graph_copy.graph['Average distance clutch-input'] = mean(
-                    clutch_path_lengths)
-                graph_copy.graph[
-                    'Standard deviation distante input/cluches'] = np.std(
-                    clutch_path_lengths)
+                dict_clutch_connections, clutch_nodes, clutch_edges = self.clutch_overlay(cycles, clutch_combination)
                 list_dict_clutch_connections.append(dict_clutch_connections)
-                new_list_gearbox_graphs.append(graph_copy)
+                new_list_gearbox_graphs.append(self.clutch_graph(topology, clutch_nodes, clutch_edges))
 
         return new_list_gearbox_graphs, list_dict_clutch_connections, list_clutch_combinations, list_cycles
 
-    def generate(self):
-        generate_connections = self.generate_connections()
-        generate_paths = self.generate_paths(generate_connections)
-        clutch_analisys = self.clutch_analisys(generate_paths)
-        list_gearbox_solutions = []
-        clutch_gearbox_graphs = clutch_analisys[0]
-        list_clutch_connections = clutch_analisys[1]
-        list_clutch_combinations = [clutch_combination for clutch_combinations
-                                    in clutch_analisys[2] for
-                                    clutch_combination in clutch_combinations]
-        list_clutch_gearbox_graphs = []
-        for i_graph, graph in enumerate(clutch_gearbox_graphs):
-            valid = True
-            graph_copy = copy.deepcopy(graph)
-            clutch_connections = list_clutch_connections[i_graph]
-            for i, connections in enumerate(
-                    list(list_clutch_connections[i_graph])):
-                if i != 0:
-                    if list_clutch_connections[i_graph][i + 1] == \
-                            list_clutch_connections[i_graph][i]:
-                        print(list_clutch_connections[i_graph][i + 1],
-                              list_clutch_connections[i_graph][i])
-                        valid = False
-                        break
-            if not valid:
-                continue
-            for node in graph.nodes():
-                if 'Clutch' in list(graph.nodes()[node].keys()):
-                    for edge in graph.edges():
-                        if node in edge:
-                            clutch_link_values = [value for values in
-                                                  clutch_connections.values()
-                                                  for value in values]
-                            if edge[0] in clutch_link_values or edge[
-                                1] in clutch_link_values:
-                                graph_copy.remove_edge(edge[0], edge[1])
-                                if 'S' in edge[0]:
-                                    graph_copy.add_edge(edge[1],
-                                                        edge[0] + '-' + edge[
-                                                            1])
-                                    graph_copy.add_edge(edge[0],
-                                                        edge[0] + '-' + edge[
-                                                            1])
-                                else:
-                                    graph_copy.add_edge(edge[0],
-                                                        edge[1] + '-' + edge[
-                                                            0])
-                                    graph_copy.add_edge(edge[1],
-                                                        edge[1] + '-' + edge[
-                                                            0])
-            for node in graph_copy.nodes():
-                if graph_copy.nodes()[node]:
-                    if graph_copy.nodes()[node]['Node Type'] == 'Input Shaft':
-                        input_shaft = node
-                    if graph_copy.nodes()[node]['Node Type'] == 'Output Shaft':
-                        output_shaft = node
-            paths = nx.all_simple_paths(graph_copy, input_shaft, output_shaft)
-
-            for path in paths:
-                if not any(('S' in node and 'G' in node) for node in path):
-                    valid = False
-
-            for i_shaft, shaft in enumerate(list_clutch_combinations[i_graph]):
-                graph_copy.add_edges_from(
-                    [(shaft + '-' + clutch_connections[i_shaft + 1][0],
-                      shaft + '-' + clutch_connections[i_shaft + 1][1],
-                      {'Clucth': True})])
-            if valid:
-                gearbox = self.gearbox.copy()
-                gearbox.update_gb_graph(graph_copy)
-                list_gearbox_solutions.append(gearbox)
-                list_clutch_gearbox_graphs.append(graph_copy)
-
-        return list_gearbox_solutions  # , list_clutch_gearbox_graphs
+    def clutch_cycles(self, topology):
+        """
+        Cycles of the graph and the possible clutch positions on them.
+
+        :return: the cycles and an iterator over the clutch shaft combinations
+        """
+        cycles = nx.cycle_basis(topology.graph, root=topology.input_shaft)
+        list_cycle_shafts = []
+        for cycle in cycles:
+            cycle_shafts = []
+            for node in cycle:
+                if 'S' in node:
+                    cycle_shafts.append(node)
+            list_cycle_shafts.append(cycle_shafts)
+        return cycles, product(*list_cycle_shafts)
+
+    def clutch_overlay(self, cycles, clutch_combination):
+        """
+        Clutch positions of a combination, computed without modifying nor copying the graph.
+
+        :return: clutch connections, clutch nodes and clutch edges
+        """
+        dict_clutch_connections = {}
+        clutch_nodes = []
+        clutch_edges = []
+        for i_cycle, cycle in enumerate(cycles):
+            for i_node, node in enumerate(cycle):
+                if clutch_combination[i_cycle] == node:
+                    if clutch_combination[i_cycle] == cycle[-1]:
+                        dict_clutch_connections[i_cycle + 1] = (cycle[0], cycle[i_node - 1])
+                        clutch_edges.extend([(cycle[0], node), (cycle[i_node - 1], node)])
+                    else:
+                        dict_clutch_connections[i_cycle + 1] = (cycle[i_node + 1], cycle[i_node - 1])
+                        clutch_edges.extend([(cycle[i_node + 1], node), (cycle[i_node - 1], node)])
+                    clutch_nodes.append(node)
+        return dict_clutch_connections, clutch_nodes, clutch_edges
+
+    def clutch_graph(self, topology, clutch_nodes, clutch_edges):
+        """
+        Networkx graph of the topology with the clutch overlay applied.
+        """
+        graph_copy = copy.deepcopy(topology.graph)
+        for node in clutch_nodes:
+            graph_copy.nodes()[node]['Clutch'] = True
+        graph_copy.add_edges_from(clutch_edges, Clutch=True)
+        clutch_path_lengths = topology.input_distances(clutch_nodes)
+        graph_copy.graph['Average distance clutch-input'] = mean(
+            clutch_path_lengths)
+        graph_copy.graph[
+            'Standard deviation distante input/cluches'] = np.std(
+            clutch_path_lengths)
+        return graph_copy
+
+    def clutch_solution(self, topology, cycles, clutch_combination):
+        """
+        Graph of a clutch combination, or None if the clutch positions are not valid.
+
+        Validity is checked on the topology, the networkx graph is only built for valid solutions.
+        """
+        clutch_connections, clutch_nodes, clutch_edges = self.clutch_overlay(cycles, clutch_combination)
+        # Clutches of successive cycles must not connect the same nodes
+        cycles_numbers = sorted(clutch_connections)
+        for cycle_number, next_cycle_number in zip(cycles_numbers, cycles_numbers[1:]):
+            if clutch_connections[next_cycle_number] == clutch_connections[cycle_number]:
+                return None
+
+        clutch_link_values = [value for values in clutch_connections.values() for value in values]
+        split_edges = []
+        for node in topology.nodes:
+            if node in clutch_nodes:
+                for edge in topology.edges:
+                    if node in edge and (edge[0] in clutch_link_values or edge[1] in clutch_link_values):
+                        split_edges.append(edge)
+        # Every input-output path must go through a split shaft-gear link, i.e. the input and output shafts must be
+        # disconnected once the split edges are removed
+        if topology.is_connected(topology.input_shaft, topology.output_shaft, split_edges):
+            return None
+
+        graph_copy = self.clutch_graph(topology, clutch_nodes, clutch_edges)
+        for edge in split_edges:
+            graph_copy.remove_edge(edge[0], edge[1])
+            if 'S' in edge[0]:
+                graph_copy.add_edge(edge[1], edge[0] + '-' + edge[1])
+                graph_copy.add_edge(edge[0], edge[0] + '-' + edge[1])
+            else:
+                graph_copy.add_edge(edge[0], edge[1] + '-' + edge[0])
+                graph_copy.add_edge(edge[1], edge[1] + '-' + edge[0])
+        for i_shaft, shaft in enumerate(clutch_combination):
+            graph_copy.add_edges_from(
+                [(shaft + '-' + clutch_connections[i_shaft + 1][0],
+                  shaft + '-' + clutch_connections[i_shaft + 1][1],
+                  {'Clucth': True})])
+        return graph_copy
+
+    def generate(self, max_number_solutions: int = None, n_workers: int = 1, cache_directory: str = None):
+        return list(self.iter_generate(max_number_solutions, n_workers, cache_directory))
+
+    def iter_generate(self, max_number_solutions: int = None, n_workers: int = 1, cache_directory: str = None):
+        """
+        Stream gearbox solutions through connections enumeration, path validation and clutch analysis.
+
+        Solutions are yielded as soon as they are found, in the same order as the full passes would give them.
+
+        :param max_number_solutions: stop after this number of solutions if given
+        :param n_workers: number of processes enumerating the connections
+        :param cache_directory: directory of a TopologyCache. Generated graphs only depend on the generator \
+        parameters and the number of speed ranges, they are read from it when available and stored in it after \
+        a complete enumeration.
+        """
+        if max_number_solutions is not None and max_number_solutions <= 0:
+            return
+        if cache_directory is None:
+            graphs = self.iter_graphs(n_workers)
+        else:
+            graphs = self.cached_graphs(TopologyCache(cache_directory), n_workers)
+        for number_solutions, graph in enumerate(graphs, start=1):
+            # Solutions share the engine of the generator gearbox
+            gearbox = GearBox(self.gearbox.engine, self.gearbox.speed_ranges, copy.deepcopy(self.gearbox.ratios),
+                              name=self.gearbox.name)
+            gearbox.update_gb_graph(graph)
+            yield gearbox
+            if number_solutions == max_number_solutions:
+                return
+
+    def iter_graphs(self, n_workers: int = 1):
+        """
+        Graphs of the valid clutch combinations of all the generated topologies.
+        """
+        for graph in self.iter_paths(self.iter_connections(n_workers)):
+            topology = GearBoxTopology(graph)
+            cycles, clutch_combinations = self.clutch_cycles(topology)
+            for clutch_combination in clutch_combinations:
+                solution_graph = self.clutch_solution(topology, cycles, clutch_combination)
+                if solution_graph is not None:
+                    yield solution_graph
+
+    def cached_graphs(self, cache: TopologyCache, n_workers: int = 1):
+        key = cache.key(max_number_shaft_assemblies=self.max_number_shaft_assemblies,
+                        max_number_gears=self.max_number_gears,
+                        number_speed_ranges=len(self.gearbox.speed_ranges))
+        graphs = cache.load(key)
+        if graphs is not None:
+            yield from graphs
+            return
+        graphs = []
+        for graph in self.iter_graphs(n_workers):
+            graphs.append(graph)
+            yield graph
+        cache.save(key, graphs)
 
     def draw_graph(self, graphs_list: List[nx.Graph],
                    max_number_graphs: int = None):
@@ -835,21 +1707,20 @@ class Clustering(DessiaObject):
     standalone_in_db = True
     _non_serializable_attributes = ['df']
 
-    def __init__(self, gearboxes: List[GearBox], name: str = ""):
+    def __init__(self, gearboxes: List[GearBox], name: str = "", projection: str = 'auto',
+                 max_mds_size: int = 1000):
+        """
+        :param projection: 2D projection of the features, 'mds' (exact, O(n²) memory), 'pca' (linear) or 'auto' \
+        to use MDS up to max_mds_size gearboxes and PCA above
+        """
         self.gearboxes = gearboxes
+        self.projection = projection
+        self.max_mds_size = max_mds_size
         DessiaObject.__init__(self, name=name)
-        dict_features = {}
-        for gearbox in self.gearboxes:
-            for attr in gearbox.graph.graph.keys():
-                if attr in dict_features.keys():
-                    variable = dict_features[attr]
-                    variable.append(gearbox.graph.graph[attr])
-                    dict_features[attr] = variable
-                else:
-                    dict_features[attr] = [gearbox.graph.graph[attr]]
-        self.dict_features = dict_features
-        self.df = pd.DataFrame.from_dict(self.dict_features)
-        df_scaled = self.normalize(self.df)
+        features, features_matrix = self.features_matrix()
+        self.dict_features = {feature: features_matrix[:, i].tolist() for i, feature in enumerate(features)}
+        self.df = pd.DataFrame(features_matrix, columns=features)
+        df_scaled = self.normalize(features_matrix)
         self.labels, self.n_clusters = self.dbscan(df_scaled)
         family_groups = self.family_groups(df_scaled, self.labels)
         self.clusters = family_groups[0]
@@ -857,48 +1728,66 @@ class Clustering(DessiaObject):
         self.list_indexes_groups = family_groups[2]
         self.gearboxes_ordered = family_groups[3]
         self.matrix_mds = family_groups[4]
+
+    def features_matrix(self):
+        """
+        Graph features of the gearboxes as a (gearboxes x features) array.
+
+        :return: the features names and the matrix
+        """
+        features = list(self.gearboxes[0].graph.graph.keys())
+        features_matrix = np.array([[gearbox.graph.graph[feature] for feature in features]
+                                    for gearbox in self.gearboxes], dtype=float)
+        return features, features_matrix
  
     def normalize(self, df):
-        
         scaler = MinMaxScaler()
-        scaler.fit(df)
         df_scaled = scaler.fit_transform(df)
         return df_scaled
  
     def dbscan(self, df):
-        db = DBSCAN(eps=0.7, min_samples=3)
-        db.fit(df)
-        labels = [int(label) for label in list(db.labels_)]
+        # Many gearboxes share the same features: clustering unique rows weighted by their number of occurrences
+        # gives the same clusters, and a tree index keeps the neighbors search from being quadratic
+        _, first_indexes, inverse, counts = np.unique(df, axis=0, return_index=True, return_inverse=True,
+                                                      return_counts=True)
+        rows_order = np.argsort(first_indexes)
+        rows_ranks = np.empty(len(rows_order), dtype=int)
+        rows_ranks[rows_order] = np.arange(len(rows_order))
+        db = DBSCAN(eps=0.7, min_samples=3, algorithm='kd_tree')
+        db.fit(np.asarray(df)[first_indexes[rows_order]], sample_weight=counts[rows_order])
+        labels = [int(label) for label in list(db.labels_[rows_ranks[inverse.ravel()]])]
         # Number of clusters in labels, ignoring noise if present.
         n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
         print('Estimated number of clusters:', n_clusters)
         return labels, n_clusters
+
+    def projection_2d(self, df):
+        projection = self.projection
+        if projection == 'auto':
+            projection = 'mds' if len(df) <= self.max_mds_size else 'pca'
+        if projection == 'mds':
+            return MDS().fit_transform(df)
+        if projection == 'pca':
+            return PCA(n_components=2).fit_transform(df)
+        raise ValueError(f"Unknown projection '{self.projection}', should be 'auto', 'mds' or 'pca'")
     
     def family_groups(self, df, labels):
-        encoding_mds = MDS()
-        matrix_mds = [element.tolist() for element in encoding_mds.fit_transform(df)]
-        clusters = []
-        list_indexes_groups =[]
-        gearboxes_indexes = []
-        index = 0
-        cluster_labels_reordered = []
-        for label in labels:
-            if label not in clusters:
-                clusters.append(label)
-        for j, cluster in enumerate(clusters):
-            indexes = []
-            for i, label in enumerate(labels):
-                if cluster == label:
-                    cluster_labels_reordered.append(label)
-                    indexes.append(index)
-                    index += 1
-                    gearboxes_indexes.append(i)
-            list_indexes_groups.append(indexes)
-        new_gearboxes_order =[]
-        new_matrix_mds = []
-        for index in gearboxes_indexes:
-            new_gearboxes_order.append(self.gearboxes[index])
-            new_matrix_mds.append(matrix_mds[index])
+        matrix_mds = self.projection_2d(df)
+        labels = np.asarray(labels)
+        # Clusters in order of first appearance, gearboxes grouped by cluster keeping their relative order
+        unique_labels, first_indexes, inverse = np.unique(labels, return_index=True, return_inverse=True)
+        clusters_order = np.argsort(first_indexes)
+        clusters = unique_labels[clusters_order].tolist()
+        clusters_ranks = np.empty(len(clusters), dtype=int)
+        clusters_ranks[clusters_order] = np.arange(len(clusters))
+        gearboxes_indexes = np.argsort(clusters_ranks[inverse.ravel()], kind='stable')
+        cluster_labels_reordered = labels[gearboxes_indexes].tolist()
+        clusters_sizes = np.bincount(clusters_ranks[inverse.ravel()], minlength=len(clusters))
+        clusters_ends = np.cumsum(clusters_sizes)
+        list_indexes_groups = [list(range(end - size, end)) for size, end in zip(clusters_sizes.tolist(),
+                                                                                  clusters_ends.tolist())]
+        new_gearboxes_order = [self.gearboxes[index] for index in gearboxes_indexes]
+        new_matrix_mds = matrix_mds[gearboxes_indexes].tolist()
         return clusters, cluster_labels_reordered, list_indexes_groups, new_gearboxes_order, new_matrix_mds
 
     @plot_data_view(selector="MultiPlot")
@@ -7,7 +7,7 @@ Created on Sun Sep 29 21:32:30 2019
 """
 import copy
 import math
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 
 
 import numpy as npy
@@ -20,6 +20,8 @@ from dessia_common.decorators import plot_data_view, cad_view
 
 from scipy.optimize import minimize
 
+from tutorials.worker_pool import ordered_map, random_point, restart_seeds
+
 # =============================================================================
 
 
@@ -156,6 +158,11 @@ class Mesh(PhysicalObject):
 
 
 class Reductor(PhysicalObject):
+    """
+    Output speeds of the meshes, masses of the components and mass_reductor are cached: update is the only \
+    supported way to change the reductor. Call mass after modifying its motor, shafts or gears directly, to \
+    compute all of them again.
+    """
     _standalone_in_db = True
 
     def __init__(self, motor: Motor, shafts: List[Shaft], meshes: List[Mesh], number_solution: int = 0, name: str = ''):
@@ -165,15 +172,36 @@ class Reductor(PhysicalObject):
         self.motor = motor
         self.offset = 0.02
         self.number_solution = number_solution
+        # Output speed of each mesh and mass of each component, refreshed by update for the changed gears only
+        self._meshes_speeds = None
+        self._input_speed = None
+        self._shafts_masses = None
+        self._gears_masses = None
         self.mass_reductor = self.mass()
         PhysicalObject.__init__(self, name=name)
 
     def speed_output(self):
-
-        output_speed = self.motor.speed
-        for mesh in self.meshes:
+        if self._meshes_speeds is None or self._input_speed != self.motor.speed:
+            self._update_speeds(0)
+        if not self._meshes_speeds:
+            return self.motor.speed
+        return self._meshes_speeds[-1]
+
+    def _update_speeds(self, first_mesh: int):
+        """
+        Compute again the output speeds of the meshes from first_mesh on.
+        """
+        if first_mesh == 0:
+            self._input_speed = self.motor.speed
+            speeds = []
+            output_speed = self.motor.speed
+        else:
+            speeds = self._meshes_speeds[:first_mesh]
+            output_speed = speeds[-1]
+        for mesh in self.meshes[first_mesh:]:
             output_speed = output_speed*mesh.gear1.diameter/mesh.gear2.diameter
-        return output_speed
+            speeds.append(output_speed)
+        self._meshes_speeds = speeds
 
     def update(self, x):
         i = 0
@@ -182,15 +210,25 @@ class Reductor(PhysicalObject):
             shaft.pos_y = x[i+1]
             i += 2
 
-        for mesh in self.meshes:
+        first_changed_mesh = None
+        for i_mesh, mesh in enumerate(self.meshes):
             shaft_gear1 = mesh.gear1.shaft
             shaft_gear2 = mesh.gear2.shaft
             center_distance = ((shaft_gear1.pos_x-shaft_gear2.pos_x)**2+(shaft_gear1.pos_y-shaft_gear2.pos_y)**2)**(1/2)
 
-            mesh.gear1.diameter = x[i]
-            mesh.gear2.diameter = (center_distance-x[i]/2)*2
+            diameter1 = x[i]
+            diameter2 = (center_distance-x[i]/2)*2
+            if diameter1 != mesh.gear1.diameter or diameter2 != mesh.gear2.diameter:
+                mesh.gear1.diameter = diameter1
+                mesh.gear2.diameter = diameter2
+                self._gears_masses[i_mesh] = [mesh.gear1.mass(), mesh.gear2.mass()]
+                if first_changed_mesh is None:
+                    first_changed_mesh = i_mesh
             i += 1
-        self.mass_reductor = self.mass()
+
+        if first_changed_mesh is not None and self._meshes_speeds is not None:
+            self._update_speeds(first_changed_mesh)
+        self.mass_reductor = self._cached_mass()
 
     @plot_data_view(selector="Reductor")
     def plot_data(self):
@@ -238,15 +276,34 @@ class Reductor(PhysicalObject):
 
             z_previous_position_gear = (z_position + mesh.gear2.length / 2 + self.offset)
             z_previous_position_shaft = (z_position - mesh.gear2.length / 2 - self.offset)
+        # Shaft lengths were set from the gears: their cached masses have to follow
+        self._shafts_masses = [shaft.mass() for shaft in self.shafts]
         return primitives
 
     def mass(self):
+        """
+        Mass of the reductor, computing again the cached masses of all its shafts and gears. Cached meshes speeds \
+        are dropped too, speed_output computing them again when needed.
+        """
+        self._meshes_speeds = None
+        self._shafts_masses = [shaft.mass() for shaft in self.shafts]
+        self._gears_masses = [[meshe.gear1.mass(), meshe.gear2.mass()] for meshe in self.meshes]
+        self.mass_reductor = self._cached_mass()
+        return self.mass_reductor
+
+    def shafts_masses(self):
+        """
+        Cached masses of the shafts, which do not depend on the variables of update.
+        """
+        return self._shafts_masses
+
+    def _cached_mass(self):
         mass = 0
-        for shaft in self.shafts:
-            mass += shaft.mass()
-        for meshe in self.meshes:
-            for gear in [meshe.gear1, meshe.gear2]:
-                mass += gear.mass()
+        for shaft_mass in self._shafts_masses:
+            mass += shaft_mass
+        for gears_masses in self._gears_masses:
+            for gear_mass in gears_masses:
+                mass += gear_mass
         return mass
 
 
@@ -268,6 +325,15 @@ class Optimizer(PhysicalObject):
                            ((y_min_max[1]-y_min_max[0])**2 + (x_min_max[1]-x_min_max[0])**2)**(1/2)])
         self.bounds = bounds
 
+        # Array view of the reductor used by population_objective: shafts indices of the gears of each mesh, and
+        # gears and shafts dimensions that are not design variables
+        shaft_indices = {id(shaft): i for i, shaft in enumerate(reductor.shafts)}
+        self._gear_shafts = npy.array([[shaft_indices[id(mesh.gear1.shaft)], shaft_indices[id(mesh.gear2.shaft)]]
+                                       for mesh in reductor.meshes], dtype=int).reshape(-1, 2)
+        self._gear_lengths = [[mesh.gear1.length, mesh.gear2.length] for mesh in reductor.meshes]
+        self._gear_shaft_diameters = [[mesh.gear1.shaft.diameter, mesh.gear2.shaft.diameter]
+                                      for mesh in reductor.meshes]
+
     def objective(self, x):
         self.reductor.update(x)
         speed = self.reductor.speed_output()
@@ -317,30 +383,119 @@ class Optimizer(PhysicalObject):
             previous_radius_gear_2 = mesh.gear2.diameter/2
             previous_radius_shaft = shaft_gear1.diameter/2
 
-        functional += self.reductor.mass()/10
+        functional += self.reductor.mass_reductor/10
+
+        return functional
+
+    def population_objective(self, population):
+        """
+        Objective of each row of a (population size x number of variables) matrix, without updating the reductor.
+
+        Penalties and mass are the ones of objective, computed in the same order for the whole population: results
+        only differ from objective ones by rounding errors of the center distances square roots.
+        """
+        population = npy.atleast_2d(npy.asarray(population, dtype=float))
+        number_shafts = len(self.reductor.shafts)
+        positions_x = population[:, 0:2*number_shafts:2]
+        positions_y = population[:, 1:2*number_shafts:2]
+
+        # Gear diameters as set by Reductor.update
+        diameters = npy.empty((len(population), len(self.reductor.meshes), 2))
+        for i_mesh, (i_shaft1, i_shaft2) in enumerate(self._gear_shafts):
+            center_distance = ((positions_x[:, i_shaft1]-positions_x[:, i_shaft2])**2
+                               + (positions_y[:, i_shaft1]-positions_y[:, i_shaft2])**2)**(1/2)
+            diameters[:, i_mesh, 0] = population[:, 2*number_shafts+i_mesh]
+            diameters[:, i_mesh, 1] = (center_distance-population[:, 2*number_shafts+i_mesh]/2)*2
+
+        speed = npy.full(len(population), self.reductor.motor.speed, dtype=float)
+        for i_mesh in range(len(self.reductor.meshes)):
+            speed = speed*diameters[:, i_mesh, 0]/diameters[:, i_mesh, 1]
+        functional = npy.zeros(len(population))
+        functional += (self.speed_output - speed)**2
+
+        for i_mesh, (i_shaft1, i_shaft2) in enumerate(self._gear_shafts):
+            diameter1 = diameters[:, i_mesh, 0]
+            diameter2 = diameters[:, i_mesh, 1]
+            functional += npy.where(diameter2 < self._gear_shaft_diameters[i_mesh][1], 10, 0)
+            functional += npy.where(positions_x[:, i_shaft2] < positions_x[:, i_shaft1], 10, 0)
+            functional += npy.where(positions_y[:, i_shaft2] < positions_y[:, i_shaft1], 10, 0)
+
+            if i_mesh > 0:
+                previous_radius_gear_1 = diameters[:, i_mesh-1, 0]/2
+                previous_radius_gear_2 = diameters[:, i_mesh-1, 1]/2
+                previous_radius_shaft = self._gear_shaft_diameters[i_mesh-1][0]/2
+                previous = previous_radius_gear_1 != 0
+                functional += npy.where(
+                    previous & (diameter1/2 > previous_radius_gear_1+previous_radius_gear_2-previous_radius_shaft),
+                    10, 0)
+                functional += npy.where(
+                    previous & ((diameter1+diameter2-self._gear_shaft_diameters[i_mesh][1])/2
+                                < previous_radius_gear_2), 10, 0)
+
+            for i_gear, i_shaft in enumerate((i_shaft1, i_shaft2)):
+                radius = diameters[:, i_mesh, i_gear]/2
+                position_x = positions_x[:, i_shaft]
+                position_y = positions_y[:, i_shaft]
+                functional += npy.where(position_x-radius < self.x_min_max[0],
+                                        (position_x-radius-self.x_min_max[0])**2, 0)
+                functional += npy.where(position_x+radius > self.x_min_max[1],
+                                        (position_x-radius-self.x_min_max[1])**2, 0)
+                functional += npy.where(position_y-radius < self.y_min_max[0],
+                                        (position_y-radius-self.y_min_max[0])**2, 0)
+                functional += npy.where(position_y+radius > self.y_min_max[1],
+                                        (position_y-radius-self.y_min_max[1])**2, 0)
+
+        mass = npy.zeros(len(population))
+        # Shafts masses do not depend on the design variables: they are the ones cached by the reductor
+        for shaft_mass in self.reductor.shafts_masses():
+            mass += shaft_mass
+        for i_mesh in range(len(self.reductor.meshes)):
+            for i_gear in range(2):
+                mass += 7500 * math.pi*self._gear_lengths[i_mesh][i_gear]*(diameters[:, i_mesh, i_gear]/2)**2
+        functional += mass/10
 
         return functional
 
     def cond_init(self):
-        x0 = []
-        for interval in self.bounds:
-            x0.append((interval[1]-interval[0])*float(npy.random.random(1))+interval[0])
-        return x0
-
-    def optimize(self, max_loops: int = 500):
-        valid = True
-        count = 0
+        return random_point(self.bounds)
+
+    def restart(self, x0):
+        self.reductor.update(x0)
+        res = minimize(self.objective, x0, bounds=self.bounds)
+        return list(res.x), float(res.fun), bool(res.success)
+
+    def seeded_restart(self, restart_seed: npy.random.SeedSequence = None):
+        return self.restart(random_point(self.bounds, restart_seed))
+
+    def optimize(self, max_loops: int = 500, n_workers: int = 1, seed: int = None, tolerance: float = 1e-3,
+                 progress_callback: Callable[[int, int, int], None] = None):
+        """
+        Run max_loops minimizations from random start points and return the distinct reductors found.
+
+        :param tolerance: largest difference on shaft positions and gear diameters under which two solutions \
+        are the same layout, only the best of them being kept
+        :param progress_callback: called after each restart with the number of restarts done, max_loops and the \
+        number of distinct solutions found so far
+        """
+        seeds = restart_seeds(max_loops, seed, n_workers)
+        solutions = []
+        for count, (x, fun, success) in enumerate(ordered_map(self, 'seeded_restart', seeds, n_workers), 1):
+            if fun < 10 and success:
+                for i, (other_x, other_fun) in enumerate(solutions):
+                    if npy.max(npy.abs(npy.subtract(x, other_x))) <= tolerance:
+                        if fun < other_fun:
+                            solutions[i] = (x, fun)
+                        break
+                else:
+                    solutions.append((x, fun))
+            if progress_callback is not None:
+                progress_callback(count, max_loops, len(solutions))
+
         list_reductor = []
-        while valid and count < max_loops:
-            x0 = self.cond_init()
-            self.reductor.update(x0)
-            res = minimize(self.objective, x0, bounds=self.bounds)
-            count += 1
-            if res.fun < 10 and res.success:
-                print(count)
-                self.reductor.update(res.x)
-                self.reductor.number_solution = len(list_reductor)
-                list_reductor.append(copy.deepcopy(self.reductor))
+        for x, _ in solutions:
+            self.reductor.update(x)
+            self.reductor.number_solution = len(list_reductor)
+            list_reductor.append(copy.deepcopy(self.reductor))
         return list_reductor
 
 
@@ -5,11 +5,12 @@ Created on Sun Sep 29 21:32:30 2019
 
 @author: jezequel
 """
+import array
+import bisect
 import copy
+import hashlib
 import math
-from typing import List, Tuple
-
-import dectree as dt
+from typing import Any, Dict, List, Tuple
 
 import numpy as npy
 import plot_data
@@ -19,6 +20,8 @@ from volmdlr.shapes import Solid
 import volmdlr.primitives3d as p3d
 from dessia_common.core import DessiaObject, PhysicalObject
 from dessia_common.decorators import plot_data_view, cad_view
+from dessia_common.serialization import deserialize, update_pointers_data
+from dessia_common.utils.diff import dict_data_eq
 from scipy.optimize import minimize
 
 # =============================================================================
@@ -163,6 +166,11 @@ class Mesh(DessiaObject):
 
 
 class Reductor(PhysicalObject):
+    """
+    Output speeds of the meshes, masses of the components and mass_reductor are cached: update is the only \
+    supported way to change the reductor. Call mass after modifying its motor, shafts or gears directly, to \
+    compute all of them again.
+    """
     _standalone_in_db = True
 
     def __init__(self, motor: Motor, shafts: List[Shaft], meshes: List[Mesh], number_solution: int = 0, name: str = ''):
@@ -172,14 +180,25 @@ class Reductor(PhysicalObject):
         self.offset = 0.02
         self.number_solution = number_solution
         DessiaObject.__init__(self, name=name)
+        # Output speed of each mesh and mass of each component. Tooth numbers do not change once the reductor is
+        # built, and update only computes again the masses of the gears whose diameter changed
+        self._meshes_speeds = None
+        self._input_speed = None
+        self._shafts_masses = None
+        self._gears_masses = None
         self.mass_reductor = self.mass()
 
     def speed_output(self):
-
-        output_speed = self.motor.speed
-        for mesh in self.meshes:
-            output_speed = output_speed * mesh.gear1.z / mesh.gear2.z
-        return output_speed
+        if self._meshes_speeds is None or self._input_speed != self.motor.speed:
+            self._input_speed = self.motor.speed
+            self._meshes_speeds = []
+            output_speed = self.motor.speed
+            for mesh in self.meshes:
+                output_speed = output_speed * mesh.gear1.z / mesh.gear2.z
+                self._meshes_speeds.append(output_speed)
+        if not self._meshes_speeds:
+            return self.motor.speed
+        return self._meshes_speeds[-1]
 
     def update(self, x):
         i = 0
@@ -189,18 +208,22 @@ class Reductor(PhysicalObject):
             shaft.pos_y = x[i + 1]
 
             i += 2
-        for mesh in self.meshes:
+        for i_mesh, mesh in enumerate(self.meshes):
 
             shaft_gear1 = mesh.gear1.shaft
             shaft_gear2 = mesh.gear2.shaft
             center_distance = ((shaft_gear1.pos_x - shaft_gear2.pos_x) ** 2 + (
                     shaft_gear1.pos_y - shaft_gear2.pos_y) ** 2) ** (1 / 2)
-            mesh.gear1.diameter = 2 * center_distance * mesh.gear1.z / (mesh.gear1.z + mesh.gear2.z)
-            mesh.gear2.diameter = 2 * center_distance * mesh.gear2.z / (mesh.gear1.z + mesh.gear2.z)
-            mesh.gear1.module = mesh.gear1.diameter / mesh.gear1.z
-            mesh.gear2.module = mesh.gear1.module
+            diameter1 = 2 * center_distance * mesh.gear1.z / (mesh.gear1.z + mesh.gear2.z)
+            diameter2 = 2 * center_distance * mesh.gear2.z / (mesh.gear1.z + mesh.gear2.z)
+            if diameter1 != mesh.gear1.diameter or diameter2 != mesh.gear2.diameter:
+                mesh.gear1.diameter = diameter1
+                mesh.gear2.diameter = diameter2
+                mesh.gear1.module = mesh.gear1.diameter / mesh.gear1.z
+                mesh.gear2.module = mesh.gear1.module
+                self._gears_masses[i_mesh] = [mesh.gear1.mass(), mesh.gear2.mass()]
 
-        self.mass_reductor = self.mass()
+        self.mass_reductor = self._cached_mass()
 
     @plot_data_view(selector="Reductor")
     def plot_data(self):
@@ -248,15 +271,28 @@ class Reductor(PhysicalObject):
 
             z_previous_position_gear = (z_position + mesh.gear2.length / 2 + self.offset)
             z_previous_position_shaft = (z_position - mesh.gear2.length / 2 - self.offset)
+        # Shaft lengths were set from the gears: their cached masses have to follow
+        self._shafts_masses = [shaft.mass() for shaft in self.shafts]
         return primitives
 
     def mass(self):
+        """
+        Mass of the reductor, computing again the cached masses of all its shafts and gears. Cached meshes speeds \
+        are dropped too, speed_output computing them again when needed.
+        """
+        self._meshes_speeds = None
+        self._shafts_masses = [shaft.mass() for shaft in self.shafts]
+        self._gears_masses = [[meshe.gear1.mass(), meshe.gear2.mass()] for meshe in self.meshes]
+        self.mass_reductor = self._cached_mass()
+        return self.mass_reductor
+
+    def _cached_mass(self):
         mass = 0
-        for shaft in self.shafts:
-            mass += shaft.mass()
-        for meshe in self.meshes:
-            for gear in [meshe.gear1, meshe.gear2]:
-                mass += gear.mass()
+        for shaft_mass in self._shafts_masses:
+            mass += shaft_mass
+        for gears_masses in self._gears_masses:
+            for gear_mass in gears_masses:
+                mass += gear_mass
         return mass
 
 
@@ -333,7 +369,7 @@ class Optimizer(DessiaObject):
             previous_radius_gear_2 = mesh.gear2.diameter / 2
             previus_radius_shaft = shaft_gear1.diameter / 2
 
-        functional += self.reductor.mass() / 10
+        functional += self.reductor.mass_reductor / 10
 
         return functional
 
@@ -364,61 +400,162 @@ class Optimizer(DessiaObject):
 class Generator(DessiaObject):
 
     def __init__(self, motor: Motor, speed_output: float, precision: float = 0.1, z_min_max: Tuple[int, int] = [4, 80],
-                 length_gears: float = 0.01, name: str = ''):
+                 length_gears: float = 0.01, number_stages: int = 2, name: str = ''):
         self.motor = motor
         self.speed_output = speed_output
         self.length_gears = length_gears
         self.z_min_max = z_min_max
         self.precision = precision
+        self.number_stages = number_stages
         self.speed_input = motor.speed
         DessiaObject.__init__(self, name=name)
 
-    def instanciate(self):
-        shafts = [Shaft(pos_x=0, pos_y=0, length=0.1), Shaft(pos_x=0, pos_y=0, length=0.1),
-                  Shaft(pos_x=0, pos_y=0, length=0.1)]
-
-        gear1 = Gear(z=1, length=self.length_gears, shaft=shafts[0])
-        gear2 = Gear(z=1, length=self.length_gears, shaft=shafts[1])
-        gear3 = Gear(z=1, length=self.length_gears, shaft=shafts[1])
-        gear4 = Gear(z=1, length=self.length_gears, shaft=shafts[2])
-        meshes = [Mesh(gear1, gear2), Mesh(gear3, gear4)]
+    def instanciate(self, teeth: List[int] = None):
+        """
+        Reductor of number_stages meshes, each one on its own pair of shafts.
+
+        :param teeth: tooth numbers of the gears, z1, z2 of the first mesh, then z3, z4 of the second one and so on
+        """
+        if teeth is None:
+            teeth = 2 * self.number_stages * [1]
+        shafts = [Shaft(pos_x=0, pos_y=0, length=0.1) for _ in range(self.number_stages + 1)]
+        meshes = []
+        for i_stage in range(self.number_stages):
+            gear1 = Gear(z=teeth[2 * i_stage], length=self.length_gears, shaft=shafts[i_stage])
+            gear2 = Gear(z=teeth[2 * i_stage + 1], length=self.length_gears, shaft=shafts[i_stage + 1])
+            meshes.append(Mesh(gear1, gear2))
 
         reductor = Reductor(self.motor, shafts, meshes)
         return reductor
 
+    def stage_pairs(self):
+        """
+        Coprime tooth numbers (z1, z2) of a mesh going the way of the output speed, sorted by ratio z1 / z2.
+        """
+        z_values = range(self.z_min_max[0], self.z_min_max[1])
+        pairs = []
+        for z1 in z_values:
+            for z2 in z_values:
+                if (z1 > z2 if self.speed_input < self.speed_output else z1 < z2) and math.gcd(z1, z2) == 1:
+                    pairs.append((z1, z2))
+        pairs.sort(key=lambda pair: pair[0] / pair[1])
+        return pairs
+
+    def teeth_solutions(self):
+        """
+        Tooth numbers of the reductors whose output speed is within precision of speed_output, a row per reductor \
+        in increasing order.
+
+        Meshes ratios are searched by bisection in the sorted stage pairs: a mesh is kept only if the ratios \
+        reachable by the following ones can still bring the output speed in the precision window.
+        """
+        pairs = self.stage_pairs()
+        ratios = [z1 / z2 for z1, z2 in pairs]
+        min_speed = self.speed_output * (1 - self.precision)
+        max_speed = self.speed_output * (1 + self.precision)
+        # Flat buffer of the tooth numbers, lighter than a tuple per solution
+        solutions = array.array('i')
+
+        def search(teeth, speed, number_stages):
+            # Ratios of the stages after this one, bounds being widened against rounding errors
+            min_ratio = ratios[0] ** (number_stages - 1)
+            max_ratio = ratios[-1] ** (number_stages - 1)
+            start = bisect.bisect_left(ratios, min_speed / (speed * max_ratio) * (1 - 1e-9))
+            stop = bisect.bisect_right(ratios, max_speed / (speed * min_ratio) * (1 + 1e-9))
+            for z1, z2 in pairs[start:stop]:
+                # Same operations order as Reductor.speed_output
+                stage_speed = speed * z1 / z2
+                if number_stages > 1:
+                    search(teeth + (z1, z2), stage_speed, number_stages - 1)
+                elif min_speed < stage_speed < max_speed:
+                    solutions.extend(teeth)
+                    solutions.extend((z1, z2))
+
+        if pairs:
+            search((), self.speed_input, self.number_stages)
+        solutions = npy.frombuffer(solutions, dtype=npy.intc).reshape(-1, 2 * self.number_stages)
+        return solutions[npy.lexsort(solutions.T[::-1])]
+
     def generate(self):
-        list_node = []
-        list_gear = []
-        reductor = self.instanciate()
-
-        for meshe in reductor.meshes:
-            for gear in [meshe.gear1, meshe.gear2]:
-                list_node.append(self.z_min_max[1] - self.z_min_max[0])
-                list_gear.append(gear)
-        tree = dt.RegularDecisionTree(list_node)
-        list_reductor = []
-
-        while not tree.finished:
-            valid = True
-            node = tree.current_node
-            list_gear[len(node) - 1].z = node[-1] + self.z_min_max[0]
-            if len(node) == 2 or len(node) == 4:
-                if self.speed_input < self.speed_output:
-                    if node[-2] <= node[-1]:
-                        valid = False
-                else:
-                    if node[-2] >= node[-1]:
-                        valid = False
-
-                if math.gcd(list_gear[len(node) - 1].z, list_gear[len(node) - 2].z) != 1:
-                    valid = False
-
-            if len(node) == len(list_gear) and valid:
-                if self.speed_output * (1 - self.precision) < reductor.speed_output() < self.speed_output * (1 + self.precision):
-                    list_reductor.append(copy.deepcopy(reductor))
-                else:
-                    valid = False
-
-            tree.NextNode(valid)
-
-        return list_reductor
+        return [self.instanciate(teeth) for teeth in self.teeth_solutions().tolist()]
+
+    def solutions(self):
+        """
+        Same solutions as generate, stored as their tooth numbers and only instantiated as reductors on demand.
+        """
+        return ReductorSolutions(self, self.teeth_solutions())
+
+
+class ReductorSolutions(DessiaObject):
+    """
+    Reductors found by a generator, stored as their tooth numbers. Reductors are instantiated on demand, when a \
+    solution is indexed, iterated over or selected with the reductor method.
+
+    :param teeth: tooth numbers of each reductor, as given to Generator.instanciate
+    """
+    _standalone_in_db = True
+    _non_serializable_attributes = ['teeth', 'ratios', 'speeds']
+
+    def __init__(self, generator: Generator, teeth: List[List[int]], name: str = ''):
+        self.generator = generator
+        self.teeth = npy.asarray(teeth, dtype=npy.int32).reshape(-1, 2 * generator.number_stages)
+        DessiaObject.__init__(self, name=name)
+
+        # Same operations order as Reductor.speed_output
+        speeds = npy.full(len(self.teeth), generator.speed_input, dtype=float)
+        for i_stage in range(generator.number_stages):
+            speeds = speeds * self.teeth[:, 2 * i_stage] / self.teeth[:, 2 * i_stage + 1]
+        self.speeds = speeds
+        self.ratios = speeds / generator.speed_input
+
+    def __len__(self):
+        return len(self.teeth)
+
+    def __getitem__(self, index: int):
+        if not -len(self) <= index < len(self):
+            raise IndexError(f'solution index {index} out of range')
+        return self.reductor(index % len(self))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.reductor(index)
+
+    def reductor(self, index: int):
+        """
+        Instantiate the reductor of a solution, its number_solution being the solution index.
+        """
+        reductor = self.generator.instanciate(self.teeth[index].tolist())
+        reductor.number_solution = index
+        return reductor
+
+    def _data_hash(self):
+        # Digest of the tooth numbers, which does not change from one process to another unlike hash()
+        teeth_hash = int(hashlib.sha256(self.teeth.tobytes()).hexdigest()[:8], 16)
+        return int((DessiaObject._data_hash(self) + teeth_hash) % 1e5)
+
+    def _data_eq(self, other_object):
+        if not npy.array_equal(self.teeth, other_object.teeth):
+            return False
+        eq_dict = self._data_eq_dict()
+        eq_dict.pop('name', None)
+        return dict_data_eq(eq_dict, other_object._data_eq_dict())
+
+    def to_dict(self, use_pointers: bool = True, memo=None, path: str = "#", id_method=True, id_memo=None):
+        d = super().to_dict(use_pointers=use_pointers, memo=memo, path=path, id_method=id_method, id_memo=id_memo)
+        d['teeth'] = self.teeth.tolist()
+        return d
+
+    @classmethod
+    def dict_to_object(cls, dict_, force_generic: bool = False, global_dict=None,
+                       pointers_memo: Dict[str, Any] = None, path: str = "#"):
+        if pointers_memo is None or global_dict is None:
+            global_dict, pointers_memo = update_pointers_data(global_dict=global_dict, current_dict=dict_,
+                                                              pointers_memo=pointers_memo)
+        generator = deserialize(dict_['generator'], global_dict=global_dict, pointers_memo=pointers_memo,
+                                path=f'{path}/generator')
+        return cls(generator=generator, teeth=dict_['teeth'], name=dict_.get('name', ''))
+
+    def __deepcopy__(self, memo=None):
+        if memo is None:
+            memo = {}
+        return self.__class__(generator=copy.deepcopy(self.generator, memo), teeth=self.teeth.copy(), name=self.name)
@@ -6,6 +6,8 @@ Created on Tue Mar  2 13:30:58 2021
 @author: wirajan
 """
 
+from contextlib import closing
+from functools import partial
 from statistics import mean
 from typing import List, Tuple
 
@@ -14,12 +16,17 @@ import plot_data
 from dessia_common.core import DessiaObject
 from dessia_common.decorators import plot_data_view
 from plot_data.colors import *
-from scipy.interpolate import interp2d
+from scipy.interpolate import RBFInterpolator
 from scipy.optimize import minimize
+from scipy.stats import qmc
+
+from tutorials.interpolation import GridInterpolator, resample_map
+from tutorials.worker_pool import call_worker_method, object_pool, ordered_map
 
 
 class EfficiencyMap(DessiaObject):
     _standalone_in_db = True
+    _non_serializable_attributes = ['bsfc', 'efficiencies', 'min_bsfc', 'max_bsfc', 'max_efficiency', 'max_torque']
     
     """
     Build the engine map and then determine its efficiency 
@@ -32,24 +39,39 @@ class EfficiencyMap(DessiaObject):
         self.fuel_hv = fuel_hv  # fuel lower heating value in J/kg
 
         DessiaObject.__init__(self,name=name)
-        
-        BSFC = []
-        for i, engine_speed in enumerate(self.engine_speeds):
-            list_bsfc = []
-            for j, engine_torque in enumerate(self.engine_torques):
-                bsfc = self.mass_flow_rate[i][j]/(engine_speed*engine_torque) # in kg/J
-                list_bsfc.append(bsfc)
-            BSFC.append(list_bsfc)
-        self.bsfc = BSFC
-        
-        efficiencies=[]
-        for list_bsfc in BSFC:
-            list_efficiencies=[]
-            for bsfc in list_bsfc:
-                efficiency = 1/(bsfc*self.fuel_hv)
-                list_efficiencies.append(efficiency)
-            efficiencies.append(list_efficiencies)
-        self.efficiencies = efficiencies
+
+        # BSFC (in kg/J) and efficiency grids indexed by [speed, torque]
+        engine_speeds = np.asarray(self.engine_speeds, dtype=float)
+        engine_torques = np.asarray(self.engine_torques, dtype=float)
+        self.bsfc = np.asarray(self.mass_flow_rate, dtype=float)/(engine_speeds[:, None]*engine_torques[None, :])
+        self.efficiencies = 1/(self.bsfc*self.fuel_hv)
+
+        self.min_bsfc = float(self.bsfc.min())
+        self.max_bsfc = float(self.bsfc.max())
+        self.max_efficiency = float(self.efficiencies.max())
+        self.max_torque = float(engine_torques.max())
+        self._efficiency_interpolator = GridInterpolator(engine_torques, engine_speeds, self.efficiencies)
+        self._bsfc_interpolator = GridInterpolator(engine_torques, engine_speeds, self.bsfc)
+
+    def efficiency_interpolator(self):
+        """
+        Interpolator of the efficiency grid, called with torques and speeds.
+        """
+        return self._efficiency_interpolator
+
+    def bsfc_interpolator(self):
+        """
+        Interpolator of the BSFC grid, called with torques and speeds.
+        """
+        return self._bsfc_interpolator
+
+    def resample(self, number_speeds: int, number_torques: int, name: str = ''):
+        """
+        Same map on a regular number_speeds x number_torques grid, see interpolation.resample_map.
+        """
+        engine_speeds, engine_torques, mass_flow_rate = resample_map(self.engine_speeds, self.engine_torques,
+                                                                     self.mass_flow_rate, number_speeds, number_torques)
+        return EfficiencyMap(engine_speeds, engine_torques, mass_flow_rate, self.fuel_hv, name=name)
 
 
 class Engine(DessiaObject):
@@ -64,18 +86,12 @@ class Engine(DessiaObject):
         DessiaObject.__init__(self,name=name)
     
     def efficiency(self, speed:float, torque:float):
-        interpolate = interp2d(self.efficiency_map.engine_torques,
-                               self.efficiency_map.engine_speeds,
-                               self.efficiency_map.efficiencies)
-        interpolate_efficiency = interpolate(torque, speed)
-        return interpolate_efficiency[0]
+        interpolate_efficiency = self.efficiency_map.efficiency_interpolator()(torque, speed)
+        return float(interpolate_efficiency)
     
     def consumption_efficiency(self, speed:float, torque: float):
-        interpolate = interp2d(self.efficiency_map.engine_torques,
-                               self.efficiency_map.engine_speeds,
-                               self.efficiency_map.bsfc)
-        interpolate_consumption_efficiency = interpolate(torque, speed)
-        return interpolate_consumption_efficiency[0]
+        interpolate_consumption_efficiency = self.efficiency_map.bsfc_interpolator()(torque, speed)
+        return float(interpolate_consumption_efficiency)
 
 
 class WLTPCycle(DessiaObject):
@@ -328,7 +344,7 @@ class GearBoxOptimizer(DessiaObject):
         objective_function = 0
         
         for engine_torque in self.engine_torques:
-            if engine_torque > max(self.gearbox.engine.efficiency_map.engine_torques):
+            if engine_torque > self.gearbox.engine.efficiency_map.max_torque:
                 objective_function += 1000
         objective_function += mean(self.fuel_consumptions)     
       
@@ -363,28 +379,133 @@ class GearBoxOptimizer(DessiaObject):
             x0.append((interval[1]-interval[0])*float(np.random.random(1))+interval[0])
         return x0
     
-    def optimize(self, max_loops: float = 1000):
-        valid = True
-        count = 0
-        list_gearbox_results = []
-        functionals = []
+    def start_points(self, number: int, seed: int = None):
+        """
+        First points of a scrambled Sobol sequence scaled to the bounds.
+        """
+        lower_bounds, upper_bounds = np.asarray(self.bounds, dtype=float).T
+        sobol = qmc.Sobol(len(self.bounds), seed=seed)
+        # Drawing a power of 2 of points keeps the balance properties of the sequence
+        unit_points = sobol.random_base2(int(np.ceil(np.log2(max(number, 1)))))[:number]
+        return qmc.scale(unit_points, lower_bounds, upper_bounds).tolist()
+
+    def restart(self, x0):
+        self.update(x0)
+        sol = minimize(self.objective, x0, bounds=self.bounds)
+        return list(sol.x), float(sol.fun), bool(sol.success)
+
+    def optimize(self, max_loops: float = 1000, n_workers: int = 1, seed: int = None,
+                 ratio_tolerance: float = 1e-3, patience: int = None):
+        """
+        Minimize from up to max_loops start points of a Sobol sequence over the bounds.
+
+        :param seed: seed of the Sobol sequence scrambling
+        :param ratio_tolerance: relative tolerance on gear ratios under which two solutions are the same one, \
+        only the best of them being kept
+        :param patience: stop once that many successive restarts found no new solution. All restarts are run if None.
+        """
+        start_points = self.start_points(int(max_loops), seed)
         solutions = []
-        while valid and count < max_loops:
-            x0 = self.cond_init()
-            self.update(x0)
-            sol = minimize(self.objective, x0, bounds=self.bounds)
-            count += 1
-            if sol.fun < max([j for i in self.gearbox.engine.efficiency_map.bsfc for j in i]) and sol.success:
-                solutions.append(sol.x)
-                functionals.append(sol.fun)
-                self.update(list(sol.x))
-                gearbox = self.gearbox.copy()
-                gearbox.ratios = self.gearbox.ratios
-                gearbox_results = GearBoxResults(gearbox, self.wltp_cycle,
-                                                 self.engine_speeds,
-                                                 self.engine_torques,
-                                                 self.fuel_consumptions,
-                                                 self.gears_ratios)
-                
-                list_gearbox_results.append(gearbox_results)
-        return [list_gearbox_results, functionals, solutions]
+        stale_restarts = 0
+        with closing(ordered_map(self, 'restart', start_points, n_workers)) as restarts:
+            for restart in restarts:
+                new_solution = self.add_solution(solutions, *restart, ratio_tolerance)
+                stale_restarts = 0 if new_solution else stale_restarts + 1
+                if patience is not None and stale_restarts >= patience:
+                    break
+        return self.solutions_results(solutions)
+
+    def optimize_surrogate(self, number_samples: int = 32, number_iterations: int = 5, number_candidates: int = 4,
+                           trust_radius: float = 0.2, n_workers: int = 1, seed: int = None,
+                           ratio_tolerance: float = 1e-3):
+        """
+        Minimize a radial basis function model of the objective, fitted on real evaluations.
+
+        The model is first fitted on number_samples points of a Sobol sequence. Each iteration minimizes it around \
+        the number_candidates best points known so far, evaluates the resulting candidates with the real simulation \
+        and fits the model again with them. Only the candidates checked by simulation are returned.
+
+        :param trust_radius: half width of the box around a point in which the model is minimized, as a fraction of \
+        the bounds. The model is not trusted far from evaluated points.
+        :param n_workers: number of processes running the simulations of the samples and candidates
+        :param seed: seed of the Sobol sequence scrambling
+        :param ratio_tolerance: relative tolerance on gear ratios under which two solutions are the same one
+        """
+        lower_bounds, upper_bounds = np.asarray(self.bounds, dtype=float).T
+        max_bsfc = self.gearbox.engine.efficiency_map.max_bsfc
+        points = self.start_points(number_samples, seed)
+        executor = None
+        if n_workers > 1:
+            executor = object_pool(self, n_workers)
+        try:
+            if executor is None:
+                def evaluate(points_):
+                    return [self.objective(x) for x in points_]
+            else:
+                def evaluate(points_):
+                    return list(executor.map(partial(call_worker_method, 'objective'), points_))
+            objectives = evaluate(points)
+            solutions = []
+            for _ in range(number_iterations):
+                # The model is fitted on the unit hypercube so that all ratio variables have the same weight, and
+                # penalties are clipped so that they do not flatten it around the optimum
+                unit_points = (np.asarray(points) - lower_bounds)/(upper_bounds - lower_bounds)
+                clipped_objectives = np.minimum(objectives, max_bsfc)
+                scale = clipped_objectives.std() or 1.
+                surrogate = RBFInterpolator(unit_points, (clipped_objectives - clipped_objectives.min())/scale,
+                                            smoothing=1e-9)
+
+                candidates = []
+                unit_candidates = []
+                for i_point in np.argsort(clipped_objectives)[:number_candidates]:
+                    bounds = list(zip(np.maximum(unit_points[i_point] - trust_radius, 0.),
+                                      np.minimum(unit_points[i_point] + trust_radius, 1.)))
+                    sol = minimize(lambda u: float(surrogate(u[None, :])[0]), unit_points[i_point], bounds=bounds)
+                    # Points already evaluated bring nothing and would make the model ill-conditioned
+                    if np.min(np.linalg.norm(unit_points - sol.x, axis=1)) < 1e-6 \
+                            or any(np.linalg.norm(other - sol.x) < 1e-6 for other in unit_candidates):
+                        continue
+                    unit_candidates.append(sol.x)
+                    candidates.append((lower_bounds + sol.x*(upper_bounds - lower_bounds)).tolist())
+                if not candidates:
+                    break
+                candidates_objectives = evaluate(candidates)
+                for x, fun in zip(candidates, candidates_objectives):
+                    self.add_solution(solutions, x, fun, True, ratio_tolerance)
+                points.extend(candidates)
+                objectives.extend(candidates_objectives)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.solutions_results(solutions)
+
+    def add_solution(self, solutions, x, fun: float, success: bool, ratio_tolerance: float):
+        """
+        Add a valid solution to a list of (x, fun, ratios) ones, unless a solution with the same ratios is known, \
+        only the best of them being kept. Tell whether the solution is a new one.
+        """
+        if not (fun < self.gearbox.engine.efficiency_map.max_bsfc and success):
+            return False
+        self.gearbox.update(x)
+        ratios = np.asarray(self.gearbox.ratios)
+        for i, (_, other_fun, other_ratios) in enumerate(solutions):
+            if np.all(np.abs(ratios - other_ratios) <= ratio_tolerance*np.abs(other_ratios)):
+                if fun < other_fun:
+                    solutions[i] = (np.asarray(x), fun, ratios)
+                return False
+        solutions.append((np.asarray(x), fun, ratios))
+        return True
+
+    def solutions_results(self, solutions):
+        list_gearbox_results = []
+        for x, _, _ in solutions:
+            self.update(list(x))
+            gearbox = self.gearbox.copy()
+            gearbox.ratios = self.gearbox.ratios
+            gearbox_results = GearBoxResults(gearbox, self.wltp_cycle,
+                                             self.engine_speeds,
+                                             self.engine_torques,
+                                             self.fuel_consumptions,
+                                             self.gears_ratios)
+            list_gearbox_results.append(gearbox_results)
+        return [list_gearbox_results, [fun for _, fun, _ in solutions], [x for x, _, _ in solutions]]
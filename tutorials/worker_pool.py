@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Process pools whose workers each hold their own copy of an object, tasks calling its methods.
+
+The object is sent once to each worker when it starts instead of being pickled with every task:
+
+    with object_pool(optimizer, n_workers) as executor:
+        futures = [executor.submit(call_worker_method, 'restart', x0) for x0 in start_points]
+
+Multistart optimizers run their restarts through ordered_map, which handles results in restarts order. Random start
+points are drawn by random_point from the own stream of each restart given by restart_seeds, so that a given seed
+gives the same results whatever the number of workers.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Copy of the pool object in the current worker process
+_worker_object = None
+
+
+def _init_worker(worker_object):
+    global _worker_object
+    _worker_object = worker_object
+
+
+def object_pool(worker_object, n_workers: int):
+    """
+    Process pool of n_workers processes, each one getting a copy of worker_object.
+    """
+    return ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(worker_object,))
+
+
+def call_worker_method(method_name: str, *args):
+    """
+    Call a method of the copy of the pool object held by the current worker.
+    """
+    return getattr(_worker_object, method_name)(*args)
+
+
+def shutdown(executor: ProcessPoolExecutor, futures=()):
+    """
+    Cancel the futures that did not start, then wait for the running ones and stop the pool.
+    """
+    for future in futures:
+        future.cancel()
+    executor.shutdown()
+
+
+def ordered_results(futures: Dict[Future, int]):
+    """
+    Results of futures mapped to their submission index, yielded in that order. Futures are gathered as they \
+    complete, each result being yielded once all the previous ones are known.
+    """
+    results = {}
+    next_index = 0
+    for future in as_completed(futures):
+        results[futures[future]] = future.result()
+        while next_index in results:
+            yield results.pop(next_index)
+            next_index += 1
+
+
+def ordered_map(worker_object, method_name: str, arguments: List, n_workers: int = 1):
+    """
+    Results of a method of worker_object called on each argument, yielded in arguments order.
+
+    Calls are run in this process if n_workers is 1, else by a pool of n_workers processes. Closing the generator \
+    cancels the calls that did not start, callers stopping early should close it.
+    """
+    if n_workers == 1:
+        for argument in arguments:
+            yield getattr(worker_object, method_name)(argument)
+        return
+    executor = object_pool(worker_object, n_workers)
+    futures = {}
+    try:
+        futures = {executor.submit(call_worker_method, method_name, argument): index
+                   for index, argument in enumerate(arguments)}
+        yield from ordered_results(futures)
+    finally:
+        shutdown(executor, futures)
+
+
+def restart_seeds(number: int, seed: int = None, n_workers: int = 1):
+    """
+    Random streams of number restarts, spawned from seed. Without a seed, restarts run in this process draw from \
+    the global numpy random state (None streams) and the ones run by workers from fresh streams.
+    """
+    if seed is None and n_workers == 1:
+        return number*[None]
+    return np.random.SeedSequence(seed).spawn(number)
+
+
+def random_point(bounds: List[Tuple[float, float]], restart_seed: np.random.SeedSequence = None):
+    """
+    Point drawn uniformly within bounds from the random stream of a restart, or the global numpy random state.
+    """
+    random = np.random.random if restart_seed is None else np.random.default_rng(restart_seed).random
+    return [(interval[1]-interval[0])*float(random())+interval[0] for interval in bounds]